@@ -1,32 +1,24 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-def convert_it(input_data):
-    # parse the input
-    lines = input_data.split('\n')
-
-    first_line = lines[0].split()
-    node_count = int(first_line[0])
-    edge_count = int(first_line[1])
+import os
+import sys
 
-    output_data = 'p edges ' + lines[0] + '\n'
-    for i in range(1, edge_count):
-        line = lines[i]
-        output_data += 'e ' + line + '\n'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
 
-    output_data += 'e ' + lines[edge_count]
+from coloring.convert import convert_text
+from common.loader import read_instance
 
-    return output_data
+def convert_it(input_data):
+    # The DIMACS text is written in blocks instead of one concatenation per edge
+    return convert_text(input_data, "col").rstrip('\n')
 
-import sys
 
 if __name__ == '__main__':
     import sys
     if len(sys.argv) > 1:
         file_location = sys.argv[1].strip()
-        with open(file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
+        input_data = read_instance(file_location)
         print(convert_it(input_data))
     else:
         print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/gc_4_1)')
-
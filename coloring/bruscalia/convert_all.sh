@@ -1,7 +1,4 @@
 #!/bin/bash
 
-for file in $(ls ../data/gc*)
-do
-  filename="$(basename "$file")"
-  python3 convert.py $file > $filename.txt
-done
+# Converts every instance in one command, writing gc_*.txt files in the current directory
+python3 ../convert.py ../data . --to col --suffix .txt
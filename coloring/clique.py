@@ -0,0 +1,141 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from random import Random
+from typing import List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from coloring.graph import Graph
+
+# Moves of the local search after the greedy clique
+clique_iterations = 2000
+# Moves during which a node removed from the clique can not come back
+clique_tabu_tenure = 7
+
+def find_clique(
+    graph: Graph,
+    iterations: int = clique_iterations,
+    seed: Optional[int] = None
+) -> List[int]:
+    """Finds a large clique, whose size is a lower bound on the number of colors
+
+    Starts from `Graph.greedy_clique` and runs a tabu local search on bitsets of the
+    adjacency. Every move adds a node adjacent to the whole clique if there is one,
+    otherwise swaps in a node adjacent to all members but one, otherwise drops a
+    random member.
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph in CSR form
+
+    iterations : int, optional
+        Moves of the local search, by default 2000
+
+    seed : Optional[int], optional
+        Seed of the random number generator, by default None
+
+    Returns
+    -------
+    List[int]
+        Sorted nodes of the largest clique found
+    """
+    best = graph.greedy_clique()
+    if graph.node_count == 0:
+        return best
+
+    rng = Random(seed)
+    adjacency = graph.adjacency_bitsets()
+    degree = graph.degree.tolist()
+    all_nodes = (1 << graph.node_count) - 1
+
+    clique = list(best)
+    mask = 0
+    for i in clique:
+        mask |= 1 << i
+    tabu_until = [0] * graph.node_count
+
+    for step in range(1, iterations + 1):
+        # Nodes adjacent to every member of the clique
+        common = all_nodes & ~mask
+        for i in clique:
+            common &= adjacency[i]
+            if not common:
+                break
+        allowed = [j for j in bit_nodes(common) if tabu_until[j] < step]
+        if allowed:
+            j = max(allowed, key=lambda j: ((adjacency[j] & common).bit_count(), degree[j]))
+            clique.append(j)
+            mask |= 1 << j
+            if len(clique) > len(best):
+                best = sorted(clique)
+            continue
+
+        # Nodes adjacent to all the members but one
+        size = len(clique)
+        swaps = [
+            j for j in range(graph.node_count)
+            if not mask >> j & 1 and tabu_until[j] < step and (adjacency[j] & mask).bit_count() == size - 1
+        ]
+        if swaps:
+            j = rng.choice(swaps)
+            out = next(i for i in clique if not adjacency[j] >> i & 1)
+            clique.remove(out)
+            clique.append(j)
+            mask ^= (1 << out) | (1 << j)
+        elif clique:
+            out = rng.choice(clique)
+            clique.remove(out)
+            mask ^= 1 << out
+        else:
+            # Every node of a small graph may be tabu once the clique is empty
+            continue
+        tabu_until[out] = step + clique_tabu_tenure
+
+    return best
+
+def bit_nodes(bitset: int) -> List[int]:
+    """Positions of the bits set in a bitset"""
+    nodes = []
+    while bitset:
+        low = bitset & -bitset
+        nodes.append(low.bit_length() - 1)
+        bitset ^= low
+    return nodes
+
+def fix_clique_colors(colors: List[int], clique: List[int]) -> List[int]:
+    """Relabels a coloring so that the i-th node of the clique has color i
+
+    Colors are swapped across the whole coloring, so a feasible coloring stays feasible.
+    A clique node sharing its color with an earlier member is recolored instead.
+
+    Parameters
+    ----------
+    colors : List[int]
+        Color of every node, with at least `len(clique)` colors 0 to k - 1
+
+    clique : List[int]
+        Nodes of a clique
+
+    Returns
+    -------
+    List[int]
+        Color of every node
+    """
+    colors = np.array(colors, dtype=np.int64)
+    for i, node in enumerate(clique):
+        color = colors[node]
+        if color == i:
+            continue
+        if color < i:
+            colors[node] = i
+            continue
+        current = colors == color
+        colors[colors == i] = color
+        colors[current] = i
+    return colors.tolist()
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import argparse
+import io
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.loader import Text, iter_instances, parse_coloring, parse_numbers
+
+# Formats of a graph: native gc_* text, DIMACS edge lists and binary edge arrays
+FORMATS = ("gc", "col", "bin")
+# Extension of the files written in every format
+EXTENSIONS = {"gc": "", "col": ".col", "bin": ".bin"}
+# First node number of the DIMACS files, 0 as in the bruscalia data and 1 in the original DIMACS benchmarks
+dimacs_base = 0
+# Edges formatted at once when writing a text format
+block_edges = 65536
+# Processes converting files at the same time
+workers = os.cpu_count() or 1
+
+def detect_format(name: str, input_data: Text) -> str:
+    """Format of a graph file from its extension, or from its first character for text files"""
+    extension = os.path.splitext(name)[1]
+    if extension == ".bin":
+        return "bin"
+    if extension == ".col":
+        return "col"
+    first = input_data.lstrip()[:1]
+    return "col" if first in ("p", "c", b"p", b"c") else "gc"
+
+def parse_dimacs(input_data: Text, base: Optional[int] = None) -> Tuple[int, np.ndarray]:
+    """Parses a DIMACS edge list, with `c` comment lines, a `p edge n m` line and `e u v` lines
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of the file
+
+    base : Optional[int], optional
+        Number of the first node, by default `dimacs_base`
+
+    Returns
+    -------
+    Tuple[int, np.ndarray]
+        Node count and array of shape (|E|, 2) with the edges, numbered from 0
+    """
+    if base is None:
+        base = dimacs_base
+    if isinstance(input_data, bytes):
+        input_data = input_data.decode()
+    node_count = None
+    edge_lines = []
+    for line in input_data.splitlines():
+        if line.startswith("e"):
+            edge_lines.append(line[1:])
+        elif line.startswith("p"):
+            node_count = int(line.split()[2])
+    if node_count is None:
+        raise ValueError("The DIMACS file must contain a 'p edge' line")
+
+    edges = parse_numbers(" ".join(edge_lines))
+    if len(edges) % 2:
+        raise ValueError("Every DIMACS edge line must contain two nodes")
+    edges = edges.reshape(-1, 2) - base
+    if edges.size and (edges.min() < 0 or edges.max() >= node_count):
+        raise ValueError("Wrong number of nodes specified")
+    return node_count, edges.astype(np.int32)
+
+def parse_edge_array(input_data: bytes) -> Tuple[int, np.ndarray]:
+    """Parses a binary edge array: little-endian int32 node count, edge count, then the pairs of nodes"""
+    numbers = np.frombuffer(input_data, dtype="<i4")
+    if len(numbers) < 2 or len(numbers) != 2 + 2 * int(numbers[1]):
+        raise ValueError("The edge array must hold its node count, its edge count and every edge")
+    node_count = int(numbers[0])
+    edges = numbers[2:].reshape(-1, 2)
+    if edges.size and (edges.min() < 0 or edges.max() >= node_count):
+        raise ValueError("Wrong number of nodes specified")
+    return node_count, edges.astype(np.int32)
+
+def read_graph(input_data: Text, fmt: str, base: Optional[int] = None) -> Tuple[int, np.ndarray]:
+    """Node count and edges of a graph in one of `FORMATS`, DIMACS nodes starting at `base`"""
+    if fmt == "gc":
+        return parse_coloring(input_data)
+    if fmt == "col":
+        return parse_dimacs(input_data, base)
+    if fmt == "bin":
+        return parse_edge_array(input_data)
+    raise ValueError(f"Unknown graph format {fmt}, expected one of {', '.join(FORMATS)}")
+
+def write_graph(f: BinaryIO, node_count: int, edges: np.ndarray, fmt: str, base: Optional[int] = None):
+    """Writes a graph in one of `FORMATS` to a binary file
+
+    Text formats are written in blocks of `block_edges` lines, each joined in one
+    go, so the time grows linearly with the number of edges. DIMACS nodes start at
+    `base`, by default `dimacs_base`.
+    """
+    edges = np.asarray(edges)
+    if fmt == "bin":
+        f.write(np.array([node_count, len(edges)], dtype="<i4").tobytes())
+        f.write(np.ascontiguousarray(edges, dtype="<i4").tobytes())
+        return
+
+    if fmt == "gc":
+        header, line = f"{node_count} {len(edges)}\n", "{} {}\n"
+    elif fmt == "col":
+        header, line = f"p edges {node_count} {len(edges)}\n", "e {} {}\n"
+        edges = edges + (dimacs_base if base is None else base)
+    else:
+        raise ValueError(f"Unknown graph format {fmt}, expected one of {', '.join(FORMATS)}")
+    f.write(header.encode())
+    for start in range(0, len(edges), block_edges):
+        block = edges[start:start + block_edges].tolist()
+        f.write("".join([line.format(u, v) for u, v in block]).encode())
+
+def output_name(name: str, fmt: str, suffix: Optional[str] = None) -> str:
+    """Name of the converted file: the name without its graph extension, then the extension of `fmt`"""
+    stem, extension = os.path.splitext(name)
+    if extension not in (".col", ".bin", ".txt"):
+        stem = name
+    return stem + (EXTENSIONS[fmt] if suffix is None else suffix)
+
+def convert_file(
+    name: str,
+    input_data: Text,
+    output_dir: str,
+    fmt: str,
+    suffix: Optional[str] = None,
+    base: Optional[int] = None
+) -> str:
+    """Converts one graph to `fmt` into `output_dir` and returns the path written"""
+    node_count, edges = read_graph(input_data, detect_format(name, input_data), base)
+    path = os.path.join(output_dir, output_name(name, fmt, suffix))
+    with open(path, "wb") as f:
+        write_graph(f, node_count, edges, fmt, base)
+    return path
+
+def convert_all(
+    location: str,
+    output_dir: str,
+    fmt: str,
+    suffix: Optional[str] = None,
+    workers: int = workers,
+    base: Optional[int] = None
+) -> List[str]:
+    """Converts every graph of a directory, a `data.zip` bundle or a single file
+
+    The files are read one after the other and converted by a pool of `workers`
+    processes, started once for the whole run instead of once per file. The
+    formatting is pure Python, so threads would share the GIL. A file is only
+    read once fewer than `workers` are being converted, so at most that many are
+    held in memory.
+
+    Parameters
+    ----------
+    location : str
+        Data directory, zip bundle or single graph file
+
+    output_dir : str
+        Directory of the converted files, created if needed
+
+    fmt : str
+        Format of the output, one of `FORMATS`
+
+    suffix : Optional[str], optional
+        Extension of the output files instead of the one of `fmt`, such as ".txt", by default None
+
+    workers : int, optional
+        Processes converting files at the same time, by default the number of CPUs
+
+    base : Optional[int], optional
+        Number of the first node of the DIMACS files read and written, by default `dimacs_base`
+
+    Returns
+    -------
+    List[str]
+        Paths written, in the order of the input
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown graph format {fmt}, expected one of {', '.join(FORMATS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    # The workers may not share the module state of this process
+    base = dimacs_base if base is None else base
+    futures = []
+    pending = set()
+    with ProcessPoolExecutor(workers) as pool:
+        for name, input_data in iter_instances(location):
+            if len(pending) >= workers:
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+            future = pool.submit(convert_file, name, input_data, output_dir, fmt, suffix, base)
+            futures.append(future)
+            pending.add(future)
+    return [future.result() for future in futures]
+
+def convert_text(input_data: Text, fmt: str = "col", base: Optional[int] = None) -> str:
+    """Converts one graph given as text to a text format, detecting the format of the input"""
+    node_count, edges = read_graph(input_data, detect_format("", input_data), base)
+    f = io.BytesIO()
+    write_graph(f, node_count, edges, fmt, base)
+    return f.getvalue().decode()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Converts graphs between the gc_*, DIMACS and binary edge array formats")
+    parser.add_argument("location", help="data directory, data.zip bundle or single graph file")
+    parser.add_argument("output_dir", help="directory of the converted files")
+    parser.add_argument("--to", choices=FORMATS, default="col", help="format of the output")
+    parser.add_argument("--suffix", help="extension of the output files, such as .txt")
+    parser.add_argument("--workers", type=int, default=workers)
+    parser.add_argument("--dimacs-base", type=int, choices=(0, 1), default=dimacs_base, help="number of the first DIMACS node")
+    args = parser.parse_args()
+
+    for path in convert_all(args.location, args.output_dir, args.to, args.suffix, args.workers, args.dimacs_base):
+        print(path)
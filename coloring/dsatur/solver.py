@@ -1,7 +1,20 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import os
+import sys
 from typing import List, Tuple
+from heapq import heapify, heappop, heappush
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from coloring.clique import find_clique
+from coloring.graph import Graph
+from common.loader import read_instance
+
+# The local search of find_clique is only run when DSatur uses at most this many colors more than
+# the greedy clique has nodes, farther off it rarely grows the clique enough to prove optimality
+clique_search_gap = 2
 
 class Color:
 
@@ -32,10 +45,6 @@ class Node:
     def __repr__(self) -> str:
         return f"N{self.index}|{self.color}"
 
-    def add_neighbor(self, node: 'Node'):
-        if node not in self.neighbors:
-            self.neighbors.append(node)
-
     def set_color(self, color: Color):
         self.color = color
         color.add_node()
@@ -57,6 +66,7 @@ class DSatur:
     N: List[Node]
     C: List[Color]
     history: List[Node]
+    graph: Graph
 
     def __init__(self, nodes: List[int], edges: List[Tuple[int, int]]):
         """Graph Coloring DSatur Algorithm proposed by Brélaz (1979)
@@ -67,16 +77,38 @@ class DSatur:
         Parameters
         ----------
         nodes : List[int]
-            List of node indexes for which colors should be defined
+            Node indexes, which must be 0 to n - 1
 
         edges : List[Tuple[int, int]]
             List of edges for which nodes can't be assigned to the same color
         """
-        N = [Node(i) for i in nodes]
-        for e in edges:
-            i, j = e
-            N[i].add_neighbor(N[j])
-            N[j].add_neighbor(N[i])
+        if list(nodes) != list(range(len(nodes))):
+            raise ValueError("Nodes must be indexed from 0 to n - 1")
+        self.init_from_graph(Graph.from_edges(len(nodes), edges))
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> 'DSatur':
+        """Instantiates the algorithm on a graph already in CSR form
+
+        Parameters
+        ----------
+        graph : Graph
+            Graph whose nodes should be colored
+
+        Returns
+        -------
+        DSatur
+            Algorithm ready to be solved
+        """
+        dsatur = cls.__new__(cls)
+        dsatur.init_from_graph(graph)
+        return dsatur
+
+    def init_from_graph(self, graph: Graph):
+        N = [Node(i) for i in range(graph.node_count)]
+        for node, neighbors in zip(N, graph.adjacency_lists()):
+            node.neighbors = [N[j] for j in neighbors]
+        self.graph = graph
         self.N = N
         self.C = []
         self.history = []
@@ -104,7 +136,7 @@ class DSatur:
             self.C.append(next_color)
         return next_color
 
-    def solve(self, save_history=False):
+    def solve(self, save_history=False, incremental=True):
         """Solve the instance
 
         Parameters
@@ -112,7 +144,15 @@ class DSatur:
         save_history : bool, optional
             Either or not to store a sequence of colores nodes in the `history` attribute,
             by default False
+
+        incremental : bool, optional
+            Either or not to keep saturation degrees up to date incrementally and pick
+            the next node from a priority queue instead of sorting the pool of uncolored
+            nodes at every step, by default True. Both modes color nodes in the same order.
         """
+        if incremental:
+            self.solve_incremental(save_history=save_history)
+            return
         Q = [n for n in self.N]  # Pool of uncolored nodes
         while len(Q) > 0:
             Q.sort(key=lambda x: (x.saturation, x.degree), reverse=True)
@@ -123,31 +163,74 @@ class DSatur:
                 self.history.append(n)
         self.C.sort(key=lambda x: x.n_nodes, reverse=True)
 
+    def solve_incremental(self, save_history=False):
+        """Solve the instance keeping saturation degrees up to date incrementally
+
+        Every uncolored node keeps a bitset of the colors used by its neighbors, so its
+        saturation only changes when a neighbor receives a color not seen before. Nodes
+        are picked from a lazy-deletion heap keyed on (saturation, degree, arrival).
+        The arrival sequence reproduces the tie-breaking of the stable sort in `solve`:
+        among nodes with the same key, the one that reached it first is colored first,
+        and nodes promoted in the same step keep their previous relative order.
+
+        Parameters
+        ----------
+        save_history : bool, optional
+            Either or not to store a sequence of colores nodes in the `history` attribute,
+            by default False
+        """
+        n_nodes = len(self.N)
+        adjacency = self.graph.adjacency_lists()
+        degree = self.graph.degree.tolist()
+        saturation = [0] * n_nodes
+        neighbor_colors = [0] * n_nodes  # Bitset of colors used by the neighbors
+        colors = [-1] * n_nodes
+        arrival = list(range(n_nodes))
+        next_arrival = n_nodes
+
+        heap = [(0, -degree[i], i, i) for i in range(n_nodes)]
+        heapify(heap)
+        while heap:
+            _, _, seq, i = heappop(heap)
+            # Skip colored nodes and stale entries left behind by a promotion
+            if colors[i] >= 0 or seq != arrival[i]:
+                continue
+
+            # Lowest color not used by any neighbor
+            used = neighbor_colors[i]
+            color = (~used & (used + 1)).bit_length() - 1
+            colors[i] = color
+
+            bit = 1 << color
+            promoted = []
+            for j in adjacency[i]:
+                if colors[j] < 0 and not neighbor_colors[j] & bit:
+                    neighbor_colors[j] |= bit
+                    saturation[j] += 1
+                    promoted.append(j)
+
+            promoted.sort(key=arrival.__getitem__)
+            for j in promoted:
+                arrival[j] = next_arrival
+                next_arrival += 1
+                heappush(heap, (-saturation[j], -degree[j], arrival[j], j))
+
+            if len(self.C) <= color:
+                self.C.append(Color(len(self.C) + 1))
+            self.N[i].set_color(self.C[color])
+            if save_history:
+                self.history.append(self.N[i])
+        self.C.sort(key=lambda x: x.n_nodes, reverse=True)
+
     @property
     def cost(self):
         return len(self.C)
 
 def solve_it(input_data):
     # parse the input
-    lines = input_data.split('\n')
-
-    first_line = lines[0].split()
-    node_count = int(first_line[0])
-    edge_count = int(first_line[1])
+    graph = Graph.from_instance(input_data)
 
-    edges = []
-    node_set = set()
-    for i in range(1, edge_count + 1):
-        line = lines[i]
-        parts = line.split()
-        edges.append((int(parts[0]), int(parts[1])))
-        node_set.add(int(parts[0]))
-        node_set.add(int(parts[1]))
-
-    nodes = sorted(node_set)
-    assert len(nodes) == node_count, "Wrong number of nodes specified"
-
-    dsatur = DSatur(nodes, edges)
+    dsatur = DSatur.from_graph(graph)
     dsatur.solve(save_history=True)
 
     solution = []
@@ -157,8 +240,14 @@ def solve_it(input_data):
     solution_node_set = set(solution)
     num_colors = len(solution_node_set)
 
+    # The coloring is optimal when it uses as many colors as a clique has nodes
+    clique_size = len(graph.greedy_clique())
+    if clique_size < num_colors <= clique_size + clique_search_gap:
+        clique_size = len(find_clique(graph))
+    optimal = int(num_colors <= clique_size)
+
     # prepare the solution in the specified output format
-    output_data = str(num_colors) + ' ' + str(0) + '\n'
+    output_data = str(num_colors) + ' ' + str(optimal) + '\n'
     output_data += ' '.join(map(str, solution))
 
     return output_data
@@ -170,8 +259,7 @@ if __name__ == '__main__':
     import sys
     if len(sys.argv) > 1:
         file_location = sys.argv[1].strip()
-        with open(file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
+        input_data = read_instance(file_location)
         print(solve_it(input_data))
     else:
         print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/gc_4_1)')
@@ -0,0 +1,244 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.cache import cached_arrays
+from common.loader import Text, parse_coloring
+
+
+class Graph:
+
+    node_count: int
+    offsets: np.ndarray
+    indices: np.ndarray
+    degree: np.ndarray
+
+    def __init__(
+        self,
+        node_count: int,
+        offsets: np.ndarray,
+        indices: np.ndarray,
+        degree: Optional[np.ndarray] = None
+    ):
+        """Undirected graph stored in compressed sparse row (CSR) form
+
+        The neighbors of node `i` are `indices[offsets[i]:offsets[i + 1]]`, sorted in
+        increasing order and without repetitions. Every edge is stored in both directions.
+
+        Parameters
+        ----------
+        node_count : int
+            Number of nodes, indexed from 0 to `node_count - 1`
+
+        offsets : np.ndarray
+            Array of `node_count + 1` positions into `indices`
+
+        indices : np.ndarray
+            Concatenated neighbor lists of all the nodes
+
+        degree : Optional[np.ndarray], optional
+            Number of neighbors of every node, computed from `offsets` if not given
+        """
+        self.node_count = node_count
+        self.offsets = offsets
+        self.indices = indices
+        self.degree = np.diff(offsets).astype(np.int32) if degree is None else degree
+
+    def __repr__(self) -> str:
+        return f"Graph(nodes={self.node_count}, edges={self.edge_count})"
+
+    @classmethod
+    def from_edges(
+        cls,
+        node_count: int,
+        edges: Union[np.ndarray, Iterable[Tuple[int, int]]]
+    ) -> 'Graph':
+        """Builds the graph from a list of edges
+
+        Repeated edges, edges given in both directions and self-loops are dropped.
+
+        Parameters
+        ----------
+        node_count : int
+            Number of nodes
+
+        edges : Union[np.ndarray, Iterable[Tuple[int, int]]]
+            Array of shape (|E|, 2) or iterable of pairs of connected nodes
+
+        Returns
+        -------
+        Graph
+            Graph in CSR form
+        """
+        edges = np.asarray(edges if isinstance(edges, np.ndarray) else list(edges), dtype=np.int64)
+        edges = edges.reshape(-1, 2)
+        if edges.size and (edges.min() < 0 or edges.max() >= node_count):
+            raise ValueError("Wrong number of nodes specified")
+
+        # Canonical (low, high) pairs, deduplicated through a single integer key
+        low = np.minimum(edges[:, 0], edges[:, 1])
+        high = np.maximum(edges[:, 0], edges[:, 1])
+        keys = np.unique((low * node_count + high)[low != high])
+        low, high = np.divmod(keys, node_count)
+
+        # Both directions, sorted by source and then by target
+        source = np.concatenate((low, high))
+        target = np.concatenate((high, low))
+        order = np.argsort(source * node_count + target, kind="stable")
+        indices = target[order].astype(np.int32)
+        offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=node_count), out=offsets[1:])
+        return cls(node_count, offsets, indices)
+
+    @classmethod
+    def from_instance(cls, input_data: Text, cache_dir: Optional[str] = None) -> 'Graph':
+        """Builds the graph of a gc_* instance through the on-disk cache
+
+        The first call parses the instance and stores the CSR arrays under the hash of
+        its contents. Later calls on the same contents memory-map them instead.
+
+        Parameters
+        ----------
+        input_data : Text
+            Contents of the instance file
+
+        cache_dir : Optional[str], optional
+            Directory of the cache, by default `common.cache.CACHE_DIR`
+
+        Returns
+        -------
+        Graph
+            Graph in CSR form, with read-only arrays when they come from the cache
+        """
+        arrays = cached_arrays(input_data, "graph", build_graph_arrays, cache_dir)
+        return cls(int(arrays["node_count"][0]), arrays["offsets"], arrays["indices"], arrays["degree"])
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices) // 2
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.indices[self.offsets[node]:self.offsets[node + 1]]
+
+    def adjacency_lists(self) -> List[List[int]]:
+        """Neighbor lists as plain Python lists, for pure-Python inner loops
+
+        Returns
+        -------
+        List[List[int]]
+            Sorted neighbors of every node
+        """
+        indices = self.indices.tolist()
+        offsets = self.offsets.tolist()
+        return [indices[offsets[i]:offsets[i + 1]] for i in range(self.node_count)]
+
+    def adjacency_bitsets(self) -> List[int]:
+        """Neighbors of every node as a Python integer with bit `j` set for neighbor `j`
+
+        Returns
+        -------
+        List[int]
+            Bitset of the neighbors of every node
+        """
+        bitsets = []
+        for neighbors in self.adjacency_lists():
+            bitset = 0
+            for j in neighbors:
+                bitset |= 1 << j
+            bitsets.append(bitset)
+        return bitsets
+
+    def greedy_clique(self) -> List[int]:
+        """Clique grown greedily from every node, keeping the largest one
+
+        Each start node is extended with the candidate of highest degree until no
+        candidate is left. The size of the clique is a lower bound on the number of colors.
+
+        Returns
+        -------
+        List[int]
+            Sorted nodes of the clique
+        """
+        adjacency = self.adjacency_bitsets()
+        by_degree = np.argsort(-self.degree, kind="stable").tolist()
+        best = []
+        for start in by_degree:
+            if self.degree[start] < len(best):
+                break
+            clique = [start]
+            candidates = adjacency[start]
+            for w in by_degree:
+                if not candidates:
+                    break
+                if candidates >> w & 1:
+                    clique.append(w)
+                    candidates &= adjacency[w]
+            if len(clique) > len(best):
+                best = clique
+        return sorted(best)
+
+    def edge_clique_cover(self) -> List[List[int]]:
+        """Cliques such that every edge has both ends in at least one of them
+
+        Every edge not covered yet is grown greedily into a maximal clique, preferring
+        nodes that also cover new edges. In a coloring model, one constraint per clique
+        and color replaces the constraints of all the edges inside the clique.
+
+        Returns
+        -------
+        List[List[int]]
+            Sorted nodes of every clique
+        """
+        adjacency = self.adjacency_bitsets()
+        uncovered = list(adjacency)  # Neighbors not yet in a clique with each node
+        cliques = []
+        for u in range(self.node_count):
+            while uncovered[u]:
+                v = (uncovered[u] & -uncovered[u]).bit_length() - 1
+                clique = [u, v]
+                candidates = adjacency[u] & adjacency[v]
+                fresh = uncovered[u] | uncovered[v]
+                while candidates:
+                    preferred = candidates & fresh
+                    pool = preferred if preferred else candidates
+                    w = (pool & -pool).bit_length() - 1
+                    clique.append(w)
+                    candidates &= adjacency[w]
+                    fresh |= uncovered[w]
+
+                members = 0
+                for i in clique:
+                    members |= 1 << i
+                for i in clique:
+                    uncovered[i] &= ~members
+                cliques.append(sorted(clique))
+        return cliques
+
+    def edges(self) -> np.ndarray:
+        """Deduplicated edges, each one once with the lower node first
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape (|E|, 2)
+        """
+        source = np.repeat(np.arange(self.node_count, dtype=np.int32), self.degree)
+        mask = source < self.indices
+        return np.column_stack((source[mask], self.indices[mask]))
+
+def build_graph_arrays(input_data: Text) -> Dict[str, np.ndarray]:
+    """Parses a gc_* instance into the arrays stored in the cache"""
+    graph = Graph.from_edges(*parse_coloring(input_data))
+    return {
+        "node_count": np.array([graph.node_count]),
+        "offsets": graph.offsets,
+        "indices": graph.indices,
+        "degree": graph.degree,
+    }
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from time import perf_counter
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from coloring.clique import find_clique
+from coloring.dsatur.solver import DSatur
+from coloring.graph import Graph
+from coloring.pyomo.solver import solve_ilp
+from coloring.tabu.solver import TabuColoring
+from common.loader import read_instance
+
+# Wall-clock budget in seconds of every stage, 0 skips the stage
+# DSatur is a single greedy pass and always runs to the end
+tabu_time_limit = 60.0
+ilp_time_limit = 60.0
+
+class Bounds:
+
+    lower: int
+    upper: int
+    colors: Optional[List[int]]
+    history: List[Dict]
+
+    def __init__(self, lower: int = 0):
+        """Lower and upper bounds on the number of colors shared by the stages of the pipeline
+
+        Parameters
+        ----------
+        lower : int, optional
+            Number of colors below which no coloring exists, by default 0
+        """
+        self.lower = lower
+        self.upper = None
+        self.colors = None
+        self.history = []
+
+    def __repr__(self) -> str:
+        return f"Bounds(lower={self.lower}, upper={self.upper})"
+
+    @property
+    def closed(self) -> bool:
+        return self.upper is not None and self.lower >= self.upper
+
+    def update(self, stage: str, start: float, colors: Optional[List[int]] = None, lower: int = 0):
+        """Keeps the coloring if it uses fewer colors and raises the lower bound
+
+        Parameters
+        ----------
+        stage : str
+            Name of the stage, for the history
+
+        start : float
+            `perf_counter` value at the start of the stage
+
+        colors : Optional[List[int]], optional
+            Feasible coloring found by the stage, by default None
+
+        lower : int, optional
+            Lower bound proven by the stage, by default 0
+        """
+        if colors is not None:
+            color_count = len(set(colors))
+            if self.upper is None or color_count < self.upper:
+                self.upper = color_count
+                self.colors = list(colors)
+        self.lower = max(self.lower, lower)
+        self.history.append({
+            "stage": stage,
+            "time": perf_counter() - start,
+            "lower": self.lower,
+            "upper": self.upper,
+        })
+
+def portfolio(
+    graph: Graph,
+    tabu_time_limit: float = tabu_time_limit,
+    ilp_time_limit: float = ilp_time_limit,
+    workers: int = 1,
+    formulation: str = "clique",
+    backend: str = "matrix",
+    seed: Optional[int] = None
+) -> Bounds:
+    """Colors a graph with DSatur, then tabu search, then the ILP model
+
+    A clique of `find_clique` gives the lower bound and its nodes keep fixed colors in
+    the later stages. DSatur gives the first coloring, tabu search tries to use fewer
+    colors within its budget and the ILP, warm started from the best coloring, tries to
+    prove it optimal within its own. The pipeline stops as soon as the lower and upper
+    bounds meet.
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph to color
+
+    tabu_time_limit : float, optional
+        Seconds given to tabu search, by default 60.0
+
+    ilp_time_limit : float, optional
+        Seconds given to the ILP, by default 60.0
+
+    workers : int, optional
+        Processes running tabu trajectories, by default 1
+
+    formulation : str, optional
+        Formulation of the ILP, "edge" or "clique", by default "clique"
+
+    backend : str, optional
+        Builder of the ILP, "pyomo" or "matrix", by default "matrix"
+
+    seed : Optional[int], optional
+        Seed of tabu search, by default None
+
+    Returns
+    -------
+    Bounds
+        Best coloring with the lower and upper bounds reached and the history of the stages
+    """
+    start = perf_counter()
+    bounds = Bounds()
+    clique = find_clique(graph, seed=seed)
+    bounds.update("clique", start, lower=len(clique))
+
+    start = perf_counter()
+    dsatur = DSatur.from_graph(graph)
+    dsatur.solve()
+    bounds.update("dsatur", start, [node.color.index - 1 for node in dsatur.N])
+
+    if not bounds.closed and tabu_time_limit > 0:
+        start = perf_counter()
+        tabu_coloring = TabuColoring(
+            graph, seed=seed, lower_bound=bounds.lower, time_limit=tabu_time_limit, clique=clique
+        )
+        colors, color_count = tabu_coloring.solve(bounds.colors, bounds.upper, workers=workers)
+        bounds.update("tabu", start, colors if color_count > 0 else None)
+
+    if not bounds.closed and ilp_time_limit > 0:
+        start = perf_counter()
+        colors, lower_bound = solve_ilp(
+            graph, bounds.colors, formulation, backend, time_limit=ilp_time_limit, clique=clique
+        )
+        bounds.update("ilp", start, colors, lower_bound)
+
+    return bounds
+
+def solve_it(input_data, tabu_time_limit = tabu_time_limit, ilp_time_limit = ilp_time_limit, workers = 1):
+    # parse the input
+    graph = Graph.from_instance(input_data)
+
+    bounds = portfolio(graph, tabu_time_limit, ilp_time_limit, workers)
+
+    # prepare the solution in the specified output format
+    output_data = str(bounds.upper) + ' ' + str(int(bounds.closed)) + '\n'
+    output_data += ' '.join(map(str, bounds.colors))
+
+    return output_data
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        input_data = read_instance(file_location)
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ../data/gc_4_1)')
@@ -2,10 +2,21 @@
 # -*- coding: utf-8 -*-
 # https://github.com/bruscalia/optimization-demo-files/blob/1fa7a3825421d0b166195d890f2629c576cfbfda/graph-coloring/graph_coloring.ipynb
 
-from typing import List, Tuple
-from random import sample
+import os
+import sys
+from time import perf_counter
+from typing import List, Optional, Tuple
+import highspy
+import numpy as np
 import pyomo.environ as pyo
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from coloring.clique import find_clique, fix_clique_colors
+from coloring.dsatur.solver import DSatur
+from coloring.graph import Graph
+from common.loader import parse_solution, read_instance
+
 # Fill every node with some color
 def fill_cstr(model, i):
     return sum(model.x[i, :]) == 1
@@ -14,6 +25,10 @@ def fill_cstr(model, i):
 def edge_cstr(model, i, j, c):
     return model.x[i, c] + model.x[j, c] <= model.y[c]
 
+# Do not repeat colors inside a clique and color is used
+def clique_cstr(model, q, c):
+    return sum(model.x[i, c] for i in model.cliques[q]) <= model.y[c]
+
 # Break symmetry by setting a preference order
 def break_symmetry(model, c):
     if model.C.first() == c:
@@ -29,7 +44,9 @@ def obj(model):
 def build_ilp(
     nodes: List[int],
     colors: List[int],
-    edges: List[Tuple[int, int]]
+    edges: List[Tuple[int, int]],
+    cliques: Optional[List[List[int]]] = None,
+    clique: Optional[List[int]] = None
 ) -> pyo.ConcreteModel:
     """Instantiates pyomo Integer Linear Programming model for the Graph Coloring Problem
 
@@ -44,6 +61,13 @@ def build_ilp(
     edges : List[Tuple[int, int]]
         Connected edges
 
+    cliques : Optional[List[List[int]]], optional
+        Cliques covering every edge, which replace the edge constraints by one
+        constraint per clique and color, by default None
+
+    clique : Optional[List[int]], optional
+        Clique whose i-th node is fixed to the i-th color, by default None
+
     Returns
     -------
     pyo.ConcreteModel
@@ -56,7 +80,11 @@ def build_ilp(
     # Create sets
     model.C = pyo.Set(initialize=colors)  # Colors
     model.N = pyo.Set(initialize=nodes)  # Nodes
-    model.E = pyo.Set(initialize=edges)  # Edges
+    if cliques is None:
+        model.E = pyo.Set(initialize=edges)  # Edges
+    else:
+        model.Q = pyo.Set(initialize=range(len(cliques)))  # Cliques
+        model.cliques = cliques
 
     # Create variables
     model.x = pyo.Var(model.N, model.C, within=pyo.Binary)
@@ -64,85 +92,276 @@ def build_ilp(
 
     # Create constraints
     model.fill_cstr = pyo.Constraint(model.N, rule=fill_cstr)
-    model.edge_cstr = pyo.Constraint(model.E, model.C, rule=edge_cstr)
+    if cliques is None:
+        model.edge_cstr = pyo.Constraint(model.E, model.C, rule=edge_cstr)
+    else:
+        model.clique_cstr = pyo.Constraint(model.Q, model.C, rule=clique_cstr)
     model.break_symmetry = pyo.Constraint(model.C, rule=break_symmetry)
 
+    # The colors of a clique are all different, fix them up front
+    # The first colors are then used, which the symmetry constraints already prefer
+    color_list = list(model.C)
+    for node, c in zip(clique or [], color_list):
+        model.x[node, c].fix(1)
+        model.y[c].fix(1)
+
     # Create objective
     model.obj = pyo.Objective(rule=obj)
 
     return model
 
-def warmstart_from_data(model, nodes, colors):
-
-    color_set=set(colors)
+def compact_colors(colors) -> np.ndarray:
+    """Relabels a coloring with the colors 0 to k - 1, k being the number of colors it uses
 
-    for n in nodes:
-        for c in color_set:
-            if c is colors[n]:
-                model.x[n, c].value = 1.0
-            else:
-                model.x[n, c].value = 0.0
+    Parameters
+    ----------
+    colors : List[int]
+        Color of every node, with any labels such as those of DSatur, tabu or `.dsa` files
 
-    for c in color_set:
-        model.y[c].value = 1.0
+    Returns
+    -------
+    np.ndarray
+        Color of every node in 0 to k - 1, keeping the order of the labels
+    """
+    _, compact = np.unique(np.asarray(colors, dtype=np.int64), return_inverse=True)
+    return compact.reshape(-1)
 
-def ilp_from_data(nodes, colors, edges) -> pyo.ConcreteModel:
+def warmstart_from_data(model, nodes, colors):
+    """Loads a coloring with the labels of `compact_colors` as the values of the model"""
+    colors = np.asarray(colors, dtype=np.int64)
+    color_list = list(model.C)
+    x_values = np.zeros((len(nodes), len(color_list)))
+    x_values[np.arange(len(nodes)), colors] = 1.0
+    model.x.set_values(dict(zip(
+        ((n, c) for n in nodes for c in color_list),
+        x_values.ravel().tolist()
+    )))
+
+    # Only the colors given to some node are used
+    used = np.bincount(colors, minlength=len(color_list)) > 0
+    model.y.set_values(dict(zip(color_list, used.astype(float).tolist())))
+
+def ilp_from_data(nodes, colors, edges, cliques=None, clique=None) -> pyo.ConcreteModel:
     """Instantiates pyomo Integer Linear Programming model for the Graph Coloring Problem
 
+    The model only has the k colors used by `colors`, the coloring of a heuristic
+    that is also the warm start, so its size follows that upper bound.
+
     Parameters
     ----------
     nodes : List of nodes
-    colors : List of colors
+    colors : Color of every node in a feasible coloring, relabeled by `compact_colors`
     edges : List of edges
+    cliques : Optional list of cliques covering the edges
+    clique : Optional clique fixed to the first colors
 
     Returns
     -------
     pyo.ConcreteModel
         `Concretemodel` of pyomo
     """
-    model = build_ilp(nodes, colors, edges)
+    colors = fix_clique_colors(compact_colors(colors), clique or [])
+    color_count = max(colors) + 1 if len(colors) else 0
+    model = build_ilp(nodes, list(range(color_count)), edges, cliques, clique)
     warmstart_from_data(model, nodes, colors)
     return model
 
-# Initialize color choice for every node
-def initialize_color(total_color_count):
+def build_matrix(
+    node_count: int,
+    color_count: int,
+    edges: np.ndarray,
+    cliques: Optional[List[List[int]]] = None,
+    clique: Optional[List[int]] = None
+) -> highspy.HighsLp:
+    """Assembles the same model as `build_ilp` directly in sparse row-wise form
 
-    new_color_list = sample(range(total_color_count), total_color_count)
-    return new_color_list
+    Column `i * color_count + c` is x[i, c] and column `node_count * color_count + c`
+    is y[c]. The rows are, in order, the fill, edge (or clique) and symmetry constraints.
 
-def solve_it(input_data,color_data = ""):
-    # parse the input
-    lines = input_data.split('\n')
+    Parameters
+    ----------
+    node_count : int
+        Number of nodes
 
-    first_line = lines[0].split()
-    node_count = int(first_line[0])
-    edge_count = int(first_line[1])
+    color_count : int
+        Number of available colors
 
-    edges_list = []
-    node_set = set()
-    for i in range(1, edge_count + 1):
-        line = lines[i]
-        parts = line.split()
-        edges_list.append((int(parts[0]), int(parts[1])))
-        node_set.add(int(parts[0]))
-        node_set.add(int(parts[1]))
+    edges : np.ndarray
+        Array of shape (|E|, 2) with the connected nodes
 
-    nodes_list = sorted(node_set)
-    assert len(nodes_list) == node_count, "Wrong number of nodes specified"
+    cliques : Optional[List[List[int]]], optional
+        Cliques covering every edge, used instead of the edges, by default None
 
-    if color_data == "":
-        colors_list = initialize_color(node_count)
+    clique : Optional[List[int]], optional
+        Clique whose i-th node is fixed to the i-th color, by default None
+
+    Returns
+    -------
+    highspy.HighsLp
+        Model ready to be passed to HiGHS
+    """
+    n, k = node_count, color_count
+    x = np.arange(n * k).reshape(n, k)
+    y = n * k + np.arange(k)
+
+    # Fill every node with some color: sum_c x[i, c] == 1
+    fill_index = x.ravel()
+    fill_value = np.ones(n * k)
+    fill_length = np.full(n, k)
+
+    # Do not repeat colors on edges or cliques: sum_{i in Q} x[i, c] - y[c] <= 0
+    # Cliques of the same size are stacked, an edge being a clique of size 2
+    if cliques is None:
+        groups = [np.asarray(edges, dtype=np.int64).reshape(-1, 2)]
     else:
-        # parse the color data if exists file with initial results
-        lines = color_data.split('\n')
+        sizes = sorted(set(len(q) for q in cliques))
+        groups = [np.array([q for q in cliques if len(q) == size], dtype=np.int64) for size in sizes]
+    conflict_index = [np.zeros(0, dtype=np.int64)]
+    conflict_length = [np.zeros(0, dtype=np.int64)]
+    for group in groups:
+        count, size = group.shape
+        members = x[group].transpose(0, 2, 1)  # (count, k, size)
+        used = np.broadcast_to(y[None, :, None], (count, k, 1))
+        conflict_index.append(np.concatenate((members, used), axis=2).ravel())
+        conflict_length.append(np.full(count * k, size + 1))
+    conflict_index = np.concatenate(conflict_index)
+    conflict_length = np.concatenate(conflict_length)
+    conflict_value = np.ones(len(conflict_index))
+    conflict_value[np.cumsum(conflict_length) - 1] = -1.0
+
+    # Break symmetry: y[c] - y[c - 1] <= 0
+    symmetry_index = np.column_stack((y[1:], y[:-1])).ravel()
+    symmetry_value = np.tile([1.0, -1.0], k - 1)
+    symmetry_length = np.full(k - 1, 2)
+
+    lengths = np.concatenate((fill_length, conflict_length, symmetry_length))
+    lp = highspy.HighsLp()
+    lp.num_col_ = n * k + k
+    lp.num_row_ = len(lengths)
+    lp.col_cost_ = np.concatenate((np.zeros(n * k), np.ones(k)))
+    # The colors of a clique are all different, fix them up front
+    col_lower = np.zeros(lp.num_col_)
+    if clique:
+        q = len(clique)
+        col_lower[x[clique, np.arange(q)]] = 1.0
+        col_lower[y[:q]] = 1.0
+    lp.col_lower_ = col_lower
+    lp.col_upper_ = np.ones(lp.num_col_)
+    lp.row_lower_ = np.concatenate((np.ones(n), np.full(len(conflict_length) + k - 1, -highspy.kHighsInf)))
+    lp.row_upper_ = np.concatenate((np.ones(n), np.zeros(len(conflict_length) + k - 1)))
+    lp.integrality_ = [highspy.HighsVarType.kInteger] * lp.num_col_
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = lp.num_col_
+    lp.a_matrix_.num_row_ = lp.num_row_
+    lp.a_matrix_.start_ = np.concatenate(([0], np.cumsum(lengths))).astype(np.int32)
+    lp.a_matrix_.index_ = np.concatenate((fill_index, conflict_index, symmetry_index)).astype(np.int32)
+    lp.a_matrix_.value_ = np.concatenate((fill_value, conflict_value, symmetry_value))
+    return lp
+
+def solve_matrix(graph, colors, cliques=None, timing=None, time_limit=None, clique=None):
+    """Solves the coloring model with HiGHS, built without any pyomo object
 
-        first_line = lines[0].split()
-        init_color_count = int(first_line[0])
-        colors_list = list(map(int, lines[1].split()))
+    Parameters
+    ----------
+    graph : Graph
+        Graph to color
+
+    colors : List[int]
+        Color of every node in a feasible coloring, whose k colors are the available
+        ones and which is given to HiGHS as the initial solution
+
+    cliques : Optional[List[List[int]]], optional
+        Cliques covering every edge, by default None
+
+    timing : Optional[Dict[str, float]], optional
+        Receives the seconds spent building (`build`) and solving (`solve`) the model
+
+    time_limit : Optional[float], optional
+        Seconds of the whole call, by default None. HiGHS gets the time left after
+        the build, and the solve is skipped when none is left. HiGHS only checks
+        its limit between the steps of its search, and a round of cuts at the root
+        of a large edge formulation can overrun it by many seconds
+
+    clique : Optional[List[int]], optional
+        Clique whose i-th node is fixed to the i-th color, by default None
+
+    Returns
+    -------
+    Tuple[List[int], int]
+        Color of every node and lower bound on the number of colors proven by HiGHS
+    """
+    start = perf_counter()
+    colors = np.array(fix_clique_colors(compact_colors(colors), clique or []), dtype=np.int64)
+    n = graph.node_count
+    k = int(colors.max()) + 1 if n else 0
+    lp = build_matrix(n, k, graph.edges(), cliques, clique)
+
+    # The build may already use up the time limit
+    time_left = None if time_limit is None else time_limit - (perf_counter() - start)
+    if time_left is not None and time_left <= 0:
+        if timing is not None:
+            timing["build"] = perf_counter() - start
+            timing["solve"] = 0.0
+        return colors.tolist(), 0
+
+    highs = highspy.Highs()
+    highs.setOptionValue("output_flag", False)
+    if time_left is not None:
+        highs.setOptionValue("time_limit", float(time_left))
+    highs.passModel(lp)
+
+    # Initial solution from the given coloring
+    initial = np.zeros(lp.num_col_)
+    initial[np.arange(n) * k + colors] = 1.0
+    initial[n * k:] = 1.0
+    solution = highspy.HighsSolution()
+    solution.col_value = initial
+    solution.value_valid = True
+    highs.setSolution(solution)
+    build_time = perf_counter() - start
+
+    highs.run()
+    if timing is not None:
+        timing["build"] = build_time
+        timing["solve"] = perf_counter() - start - build_time
+
+    # Without a better solution HiGHS may not report any, the initial one still holds
+    result = highs.getSolution()
+    if not result.value_valid:
+        return colors.tolist(), 0
+    values = np.asarray(result.col_value)[:n * k].reshape(n, k)
+    # The dual bound stays infinite when the time limit comes before HiGHS has one
+    lower_bound = highs.getInfo().mip_dual_bound
+    lower_bound = int(np.ceil(lower_bound - 1e-6)) if np.isfinite(lower_bound) else 0
+    return values.argmax(axis=1).tolist(), lower_bound
+
+def solve_pyomo(graph, colors, cliques=None, timing=None, time_limit=None, clique=None):
+    """Solves the coloring model built with pyomo rules with HiGHS
+
+    Takes the same parameters and returns the same values as `solve_matrix`. The
+    time limit is checked after the build, but pyomo loading the model into HiGHS
+    is part of the solve step and is not stopped by it.
+    """
+    start = perf_counter()
+    nodes_list = list(range(graph.node_count))
+    edges_list = [tuple(e) for e in graph.edges().tolist()]
+    ilp = ilp_from_data(nodes_list, colors, edges_list, cliques, clique)
+    build_time = perf_counter() - start
+
+    # The build may already use up the time limit, the warm start is then the answer
+    time_left = None if time_limit is None else time_limit - build_time
+    if time_left is not None and time_left <= 0:
+        if timing is not None:
+            timing["build"] = build_time
+            timing["solve"] = 0.0
+        return fix_clique_colors(compact_colors(colors), clique or []), 0
 
-    ilp = ilp_from_data(nodes_list, colors_list, edges_list)
     opt = pyo.SolverFactory("appsi_highs")
-    res = opt.solve(ilp)
+    # The model starts from the coloring given, so HiGHS begins with its bound
+    res = opt.solve(ilp, warmstart=True, timelimit=time_left)
+    if timing is not None:
+        timing["build"] = build_time
+        timing["solve"] = perf_counter() - start - build_time
 
     colors = []
     nodes = []
@@ -152,6 +371,82 @@ def solve_it(input_data,color_data = ""):
             if round(ilp.x[n, c].value, ndigits=0) == 1:
                 colors.append(c)
 
+    lower_bound = res.problem.lower_bound
+    lower_bound = int(np.ceil(lower_bound - 1e-6)) if lower_bound is not None and np.isfinite(lower_bound) else 0
+    return colors, lower_bound
+
+def solve_ilp(graph, colors, formulation="edge", backend="pyomo", timing=None, time_limit=None, clique=None):
+    """Improves a coloring with the ILP model and tries to prove it optimal
+
+    Parameters
+    ----------
+    graph : Graph
+        Graph to color
+
+    colors : List[int]
+        Feasible coloring, which sets the available colors and is the warm start
+
+    formulation : str, optional
+        "edge" for one constraint per edge and color or "clique" for one per clique
+        of `Graph.edge_clique_cover` and color, by default "edge"
+
+    backend : str, optional
+        "pyomo" to build the model with pyomo rules or "matrix" to assemble it with
+        NumPy, by default "pyomo"
+
+    timing : Optional[Dict[str, float]], optional
+        Receives the seconds spent building (`build`) and solving (`solve`) the model
+
+    time_limit : Optional[float], optional
+        Seconds of the build and the solve, by default None. HiGHS may overrun
+        it, see `solve_matrix`
+
+    clique : Optional[List[int]], optional
+        Clique of the graph, by default the one of `find_clique`. Its nodes are fixed
+        to the first colors and its size is a lower bound
+
+    Returns
+    -------
+    Tuple[List[int], int]
+        Color of every node and lower bound on the number of colors
+    """
+    if clique is None:
+        clique = find_clique(graph)
+
+    # A coloring with as many colors as the clique has nodes is already optimal
+    if len(set(colors)) <= len(clique):
+        return list(colors), len(clique)
+
+    cliques = graph.edge_clique_cover() if formulation == "clique" else None
+    if backend == "matrix":
+        colors, lower_bound = solve_matrix(graph, colors, cliques, timing, time_limit, clique)
+    else:
+        colors, lower_bound = solve_pyomo(graph, colors, cliques, timing, time_limit, clique)
+    return colors, max(lower_bound, len(clique))
+
+# Upper bound coloring from DSatur
+def initialize_color(graph):
+
+    dsatur = DSatur.from_graph(graph)
+    dsatur.solve()
+    return [node.color.index - 1 for node in dsatur.N]
+
+# formulation is "edge" for one constraint per edge and color or "clique" for one per clique and color
+# backend is "pyomo" to build the model with pyomo rules or "matrix" to assemble it with NumPy for HiGHS
+# timing, if given, receives the seconds spent building and solving the model
+def solve_it(input_data,color_data = "",formulation = "edge",backend = "pyomo",timing = None,time_limit = None):
+    # parse the input
+    graph = Graph.from_instance(input_data)
+
+    if color_data == "":
+        colors_list = initialize_color(graph)
+    else:
+        # parse the color data if exists file with initial results
+        _, _, colors_list = parse_solution(color_data)
+        colors_list = colors_list.tolist()
+
+    colors, lower_bound = solve_ilp(graph, colors_list, formulation, backend, timing, time_limit)
+
     solution = []
     for col in colors:
         solution.append(col)
@@ -159,34 +454,33 @@ def solve_it(input_data,color_data = ""):
     solution_node_set = set(solution)
     num_colors = len(solution_node_set)
 
+    # The coloring is optimal when HiGHS proved its lower bound
+    optimal = int(lower_bound >= num_colors)
+
     # prepare the solution in the specified output format
-    output_data = str(num_colors) + ' ' + str(0) + '\n'
+    output_data = str(num_colors) + ' ' + str(optimal) + '\n'
     output_data += ' '.join(map(str, solution))
 
     return output_data
 
 
-import sys
-
 if __name__ == '__main__':
-    import sys
-
-    if len(sys.argv) == 2:
-        data_file_location = sys.argv[1].strip()
-        with open(data_file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
-        print(solve_it(input_data))
-
-    elif len(sys.argv) == 3:
-        data_file_location = sys.argv[1].strip()
-        with open(data_file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
-
-        color_file_location = sys.argv[2].strip()
-        with open(color_file_location, 'r') as color_data_file:
-            color_data = color_data_file.read()
-
-        print(solve_it(input_data, color_data))
-    else:
-        print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/gc_4_1)')
-
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Improves a coloring with the ILP model and tries to prove it optimal")
+    parser.add_argument("location", help="instance file, such as ./data/gc_4_1")
+    # The colors may come from tabu, or from a .dsa file, also inside dsatur.zip
+    parser.add_argument("color_location", nargs="?", help="file with an initial coloring, DSatur by default")
+    parser.add_argument("--backend", choices=("pyomo", "matrix"), default="pyomo", help="build the model with pyomo rules or with NumPy")
+    parser.add_argument("--formulation", choices=("edge", "clique"), default="edge", help="one constraint per edge or per clique and color")
+    parser.add_argument("--time-limit", type=float, help="seconds of the build and the solve")
+    parser.add_argument("--timing", action="store_true", help="print the seconds spent building and solving the model")
+    args = parser.parse_args()
+
+    input_data = read_instance(args.location.strip())
+    color_data = "" if args.color_location is None else read_instance(args.color_location.strip())
+    timing = {} if args.timing else None
+    print(solve_it(input_data, color_data, args.formulation, args.backend, timing, args.time_limit))
+    if timing is not None:
+        # No model is built when the starting coloring already uses as many colors as the clique
+        print(' '.join(f"{step} {seconds:.3f}s" for step, seconds in timing.items()) or "no model built", file=sys.stderr)
@@ -1,13 +1,23 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from time import time
-from random import randrange, choice, sample
-from queue import Queue
+import os
+import sys
+from time import perf_counter
+from random import Random
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import Event
+from multiprocessing.shared_memory import SharedMemory
 
-# A dictionary of the list of nodes adjacent to each node
-adjacent_dict = {}
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from coloring.clique import find_clique, fix_clique_colors
+from coloring.graph import Graph
+from common.checkpoint import Checkpoint
+from common.loader import parse_solution, read_instance
 
 # Tabu table
 class Tabu:
@@ -40,275 +50,706 @@ retry_limit = 100
 # Maximum step to try. 
 # one step means change the color of a node
 step_limit = 50000
-
-# Reinitialize color choice for every node
-def initialize_color(total_color_count):
-
-    new_color_list = sample(range(total_color_count), total_color_count)
-    return new_color_list
-
-# Change the color of a node
-def change_color(node, node_neighbor_list, color_list, total_color_count, violation_dict, total_violation):
-
-    # Count the color distribution of neighbor nodes
-    color_count = [0] * total_color_count
-    for neighbor in node_neighbor_list:
-        neighbor_color = color_list[neighbor]
-        color_count[neighbor_color] += 1
-
-    min_color_count = float('inf')
-    min_color_list = []
-
-    # Select color with least violation with neighbor
-    for color in range(total_color_count):
-        # skip its own color
-        if color == color_list[node]:
-            continue
-
-        # If the color violation is smaller than the min color violation, clear the candidate list and add the color to it
-        if min_color_count > color_count[color]:
-            min_color_count = color_count[color]
-            min_color_list = [color]
-        
-        # If the color violation is the min color violation, add the color to candidate list
-        elif min_color_count == color_count[color]:
-            min_color_list.append(color)
-
-    # We must find at least one color
-    assert min_color_list
-
-    # Random sample a color from the candidate list
-    new_color = choice(min_color_list)
-
-    # Update violation for the node and its neighbor
-    # Update total violation
-    for neighbor in node_neighbor_list:
-        if color_list[neighbor] == color_list[node]:
-            violation_dict[neighbor] -=1
-            violation_dict[node] -=1
-            total_violation -= 2
-        elif color_list[neighbor] == new_color:
-            violation_dict[neighbor] +=1
-            violation_dict[node] +=1
-            total_violation += 2
-
-    color_list[node] = new_color
-
-# Remove a color from current color choice
-# it works like this, suppose there are total 10 colors from 0 ~ 9, the current color choice is:
-# 7 1 4 2 5 9 0 3 6 8 5 9 0 4 
-# If we want to remove color 5, for each color that is bigger than 5, we minus it by 1:
-# 6 1 4 2 5 8 0 3 5 7 5 8 0 4
-# then for each color equals to 5 we set it to a random color from 0 ~ 8:
-# 6 1 4 2 3 8 0 3 1 7 4 8 0 4
-
-def remove_color(color_list, total_color_count):
-
-    color_to_remove = randrange(total_color_count)
-    new_color_list = []
-
-    for c in color_list:
-        if c == color_to_remove:
-            # For each color equal to color_to_remove, set it to a random color from 0 to total_color_count - 2
-            new_color_list.append(randrange(total_color_count - 1))
-        elif c > color_to_remove:
-            # Decrement the index for colors greater than color_to_remove
-            new_color_list.append(c - 1)
+# Use the TabuCol engine, which forbids (node, color) moves, instead of the node tabu list
+# None picks TabuCol for graphs of at least tabucol_min_nodes nodes, below that the NumPy
+# overhead of a TabuCol step outweighs its better moves
+use_tabucol = None
+tabucol_min_nodes = 200
+# A color left by a node stays tabu for a random number of steps below tabucol_tenure_random
+# plus tabucol_tenure_ratio times the number of conflicting nodes (Galinier and Hao, 1999)
+tabucol_tenure_random = 10
+tabucol_tenure_ratio = 0.6
+# Steps between two checks of the stop signal in parallel mode
+stop_check_interval = 256
+# Minimum number of seconds between two writes of the checkpoint file
+checkpoint_interval = 10.0
+# Seconds of a run from the command line, a longer search resumes from the checkpoint
+cli_time_limit = 60.0
+
+# Search state of a color assignment
+class TabuState:
+    def __init__(self, adjacent_list, color_list, total_color_count, rng):
+        """Color assignment with its conflicts, updated incrementally on every move
+
+        Parameters
+        ----------
+        adjacent_list : List[List[int]]
+            Neighbors of every node
+
+        color_list : List[int]
+            Color of every node, changed in place by the moves
+
+        total_color_count : int
+            Number of colors available
+
+        rng : Random
+            Random number generator of the search
+        """
+        self.rng = rng
+        self.adjacent_list = adjacent_list
+        self.color_list = color_list
+        self.total_color_count = total_color_count
+
+        # Number of neighbors sharing the color of each node, twice the number of conflicting edges in total
+        self.violation = [0] * len(color_list)
+        self.total_violation = 0
+        # Nodes with at least one conflict
+        self.conflicting = set()
+
+        for node, neighbor_list in enumerate(adjacent_list):
+            color = color_list[node]
+            violation = 0
+            for neighbor in neighbor_list:
+                if color_list[neighbor] == color:
+                    violation += 1
+
+            self.violation[node] = violation
+            self.total_violation += violation
+            if violation:
+                self.conflicting.add(node)
+
+    def change_color(self, node):
+        """Moves a node to the color used by the fewest of its neighbors, in O(deg) time"""
+        node_neighbor_list = self.adjacent_list[node]
+        color_list = self.color_list
+
+        # Count the color distribution of neighbor nodes
+        color_count = [0] * self.total_color_count
+        for neighbor in node_neighbor_list:
+            color_count[color_list[neighbor]] += 1
+
+        # Select color with least violation with neighbor, skipping its own color
+        old_color = color_list[node]
+        min_color_count = min(count for color, count in enumerate(color_count) if color != old_color)
+        min_color_list = [color for color, count in enumerate(color_count) if count == min_color_count and color != old_color]
+
+        # We must find at least one color
+        assert min_color_list
+
+        # Random sample a color from the candidate list
+        new_color = self.rng.choice(min_color_list)
+
+        # Update violation for the node and its neighbors, and the total violation
+        violation = self.violation
+        for neighbor in node_neighbor_list:
+            if color_list[neighbor] == old_color:
+                violation[neighbor] -= 1
+                if not violation[neighbor]:
+                    self.conflicting.discard(neighbor)
+            elif color_list[neighbor] == new_color:
+                violation[neighbor] += 1
+                self.conflicting.add(neighbor)
+
+        self.total_violation += 2 * (color_count[new_color] - color_count[old_color])
+        violation[node] = color_count[new_color]
+        if violation[node]:
+            self.conflicting.add(node)
         else:
-            # Keep the colors less than color_to_remove unchanged
-            new_color_list.append(c)
-
-    return new_color_list
-
-# Count violation for every node and count total violation
-def init_violation(adjacent_dict, color_list):
-
-    violation_dict = {}
-    total_violation = 0
-
-    for node in adjacent_dict:
-        violation = 0
-
-        for neighbor in adjacent_dict[node]:
-            if color_list[node] == color_list[neighbor]:
-                violation += 1
-
-        violation_dict[node] = violation
-        total_violation += violation
-
-    return violation_dict, total_violation
-
-# Select next node to change color
-def select_next_node(violation_dict, tabu):
-    max_violation = float('-inf')
-    max_violation_node_list = []
-
-    for node in violation_dict:
-        # Skip nodes with no violation
-        if violation_dict[node] == 0:
-            continue
-
-        # Skip nodes in tabu list
-        if tabu.is_find(node):
-            continue
-
-        # If violation is max violation, add the node to candidate list
-        if max_violation == violation_dict[node]:
-            max_violation_node_list.append(node)
-
-        # If violation is bigger than max violation, clear the candidate list and add the node
-        elif max_violation < violation_dict[node]:
-            max_violation = violation_dict[node]
-            max_violation_node_list = [node]
-
-    # If no nodes with violations are available, select a random node from those in the tabu list
-    if not max_violation_node_list:
-        max_violation_node_list = [node for node in tabu.tabu_hash]
-
-    if not max_violation_node_list:
-        return -1
+            self.conflicting.discard(node)
+
+        color_list[node] = new_color
+
+# Search state of the TabuCol engine
+class TabuColState:
+    def __init__(self, graph, color_list, total_color_count, rng, tenure_random, tenure_ratio, movable):
+        """Color assignment with the gamma matrix of neighbor colors, updated incrementally
+
+        Hertz, A. and de Werra, D., 1987. Using tabu search techniques for graph coloring.
+        Computing, 39(4), 345-351.
+
+        `gamma[i, c]` is the number of neighbors of node `i` with color `c`, so moving `i`
+        to `c` changes the number of conflicts of `i` by `gamma[i, c] - gamma[i, color[i]]`.
+
+        Parameters
+        ----------
+        graph : Graph
+            Graph in CSR form
+
+        color_list : List[int]
+            Initial color of every node
+
+        total_color_count : int
+            Number of colors available
+
+        rng : Random
+            Random number generator of the search
+
+        tenure_random : int
+            Upper bound of the random part of the tabu tenure
+
+        tenure_ratio : float
+            Share of the number of conflicting nodes added to the tabu tenure
+
+        movable : np.ndarray
+            Either or not every node may change color, the nodes of the fixed clique may not
+        """
+        node_count = graph.node_count
+        self.rng = rng
+        self.movable = movable
+        self.tenure_random = tenure_random
+        self.tenure_ratio = tenure_ratio
+        self.graph = graph
+        self.colors = np.asarray(color_list, dtype=np.int64)
+
+        self.gamma = np.zeros((node_count, total_color_count), dtype=np.int32)
+        source = np.repeat(np.arange(node_count), graph.degree)
+        np.add.at(self.gamma, (source, self.colors[graph.indices]), 1)
+
+        # Number of neighbors sharing the color of each node, twice the number of conflicting edges in total
+        self.violation = self.gamma[np.arange(node_count), self.colors]
+        self.total_violation = int(self.violation.sum())
+        self.best_violation = self.total_violation
+        # Number of nodes with at least one conflict
+        self.conflicting_count = int(np.count_nonzero(self.violation))
+
+        # Step until which a node can not take back a color
+        self.tabu_until = np.zeros((node_count, total_color_count), dtype=np.int64)
+
+    def best_move(self, step):
+        """Finds the non-tabu move that most reduces the conflicts, ties broken at random
+
+        A tabu move is still allowed when it leads to fewer conflicts than the best
+        assignment found so far (aspiration).
+
+        Returns
+        -------
+        Tuple[int, int]
+            Node and new color, or (-1, -1) when every move is tabu
+        """
+        nodes = np.flatnonzero((self.violation > 0) & self.movable)
+        delta = self.gamma[nodes] - self.violation[nodes, None]
+
+        # Tabu moves are blocked unless they beat the best assignment, keeping its own color is not a move
+        blocked = self.tabu_until[nodes] > step
+        blocked &= 2 * delta >= self.best_violation - self.total_violation
+        blocked[np.arange(len(nodes)), self.colors[nodes]] = True
+
+        no_move = np.iinfo(delta.dtype).max
+        delta[blocked] = no_move
+
+        min_delta = delta.min()
+        if min_delta == no_move:
+            return -1, -1
+
+        rows, columns = np.nonzero(delta == min_delta)
+        candidate = self.rng.randrange(len(rows))
+        return int(nodes[rows[candidate]]), int(columns[candidate])
+
+    def change_color(self, node, new_color, step):
+        """Moves a node to a new color, updating gamma over its neighbors in O(deg) time"""
+        old_color = int(self.colors[node])
+        neighbors = self.graph.neighbors(node)
+        neighbor_colors = self.colors[neighbors]
+        violation = self.violation
+
+        # Neighbors leaving or joining the conflicting nodes
+        losing = neighbors[neighbor_colors == old_color]
+        gaining = neighbors[neighbor_colors == new_color]
+        self.conflicting_count += int(np.count_nonzero(violation[gaining] == 0))
+        self.conflicting_count -= int(np.count_nonzero(violation[losing] == 1))
+        violation[losing] -= 1
+        violation[gaining] += 1
+        self.gamma[neighbors, old_color] -= 1
+        self.gamma[neighbors, new_color] += 1
+
+        old_violation = len(losing)
+        new_violation = len(gaining)
+        self.total_violation += 2 * (new_violation - old_violation)
+        self.best_violation = min(self.best_violation, self.total_violation)
+        self.conflicting_count += (new_violation > 0) - (old_violation > 0)
+        violation[node] = new_violation
+        self.colors[node] = new_color
+
+        # Forbid taking the old color back for a while
+        tenure = self.rng.randrange(self.tenure_random) + int(self.tenure_ratio * self.conflicting_count)
+        self.tabu_until[node, old_color] = step + tenure
+
+class TabuColoring:
+
+    graph: Graph
+    rng: Random
+    checkpoint: Checkpoint
+
+    def __init__(
+        self,
+        graph,
+        tabu_ratio_size=tabu_ratio_size,
+        retry_limit=retry_limit,
+        step_limit=step_limit,
+        use_tabucol=use_tabucol,
+        tabucol_tenure_random=tabucol_tenure_random,
+        tabucol_tenure_ratio=tabucol_tenure_ratio,
+        seed=None,
+        checkpoint=None,
+        lower_bound=2,
+        time_limit=None,
+        clique=None
+    ):
+        """Tabu search for the Graph Coloring Problem
+
+        The solver owns its graph, parameters and random number generator, so several
+        instances can be solved one after the other or concurrently in the same process.
+
+        Parameters
+        ----------
+        graph : Graph
+            Graph whose nodes should be colored
+
+        tabu_ratio_size : int, optional
+            The node tabu list holds 1/tabu_ratio_size of the nodes, by default 10
+
+        retry_limit : int, optional
+            Trajectories tried for a number of colors before giving up, by default 100
+
+        step_limit : int, optional
+            Moves of a trajectory before it is considered infeasible, by default 50000
+
+        use_tabucol : bool, optional
+            Either or not to use the TabuCol engine instead of the node tabu list, by default None
+            to use it on graphs of at least `tabucol_min_nodes` nodes
+
+        tabucol_tenure_random : int, optional
+            Upper bound of the random part of the TabuCol tenure, by default 10
+
+        tabucol_tenure_ratio : float, optional
+            Share of the conflicting nodes added to the TabuCol tenure, by default 0.6
+
+        seed : int, optional
+            Seed of the random number generator, by default None
+
+        checkpoint : Checkpoint, optional
+            Receives every feasible coloring found, by default one kept in memory only
+
+        lower_bound : int, optional
+            Number of colors below which no coloring exists, the search stops once it
+            reaches it, by default 2
+
+        time_limit : float, optional
+            Seconds after which `solve` returns the best coloring found, by default None
+
+        clique : List[int], optional
+            Clique of the graph, by default the one of `find_clique`. Its size raises the
+            lower bound and its i-th node keeps color i during the search
+        """
+        self.graph = graph
+        self.tabu_ratio_size = tabu_ratio_size
+        self.retry_limit = retry_limit
+        self.step_limit = step_limit
+        if use_tabucol is None:
+            use_tabucol = graph.node_count >= tabucol_min_nodes
+        self.use_tabucol = use_tabucol
+        self.tabucol_tenure_random = tabucol_tenure_random
+        self.tabucol_tenure_ratio = tabucol_tenure_ratio
+        self.rng = Random(seed)
+        self.checkpoint = Checkpoint() if checkpoint is None else checkpoint
+        self.clique = find_clique(graph, seed=seed) if clique is None else list(clique)
+        self.fixed = set(self.clique)
+        self.movable = np.ones(graph.node_count, dtype=bool)
+        self.movable[self.clique] = False
+        self.lower_bound = max(lower_bound, len(self.clique), 2)
+        self.time_limit = time_limit
+        self.deadline = None
+        self._adjacent_list = None
+
+    def parameters(self):
+        return {
+            "tabu_ratio_size": self.tabu_ratio_size,
+            "retry_limit": self.retry_limit,
+            "step_limit": self.step_limit,
+            "use_tabucol": self.use_tabucol,
+            "tabucol_tenure_random": self.tabucol_tenure_random,
+            "tabucol_tenure_ratio": self.tabucol_tenure_ratio,
+            "clique": self.clique,
+        }
+
+    def timed_out(self):
+        return self.deadline is not None and perf_counter() >= self.deadline
+
+    # A trajectory stops when another worker sets stop_event or when the time is over
+    def should_stop(self, stop_event):
+        return (stop_event is not None and stop_event.is_set()) or self.timed_out()
+
+    @property
+    def adjacent_list(self):
+        # The node tabu list engine works on plain Python lists
+        if self._adjacent_list is None:
+            self._adjacent_list = self.graph.adjacency_lists()
+        return self._adjacent_list
+
+    # Reinitialize color choice for every node
+    def initialize_color(self, total_color_count):
+
+        new_color_list = self.rng.sample(range(total_color_count), total_color_count)
+        return new_color_list
+
+    # Remove a color from current color choice
+    # it works like this, suppose there are total 10 colors from 0 ~ 9, the current color choice is:
+    # 7 1 4 2 5 9 0 3 6 8 5 9 0 4 
+    # If we want to remove color 5, for each color that is bigger than 5, we minus it by 1:
+    # 6 1 4 2 5 8 0 3 5 7 5 8 0 4
+    # then for each color equals to 5 we set it to a random color from 0 ~ 8:
+    # 6 1 4 2 3 8 0 3 1 7 4 8 0 4
+    def remove_color(self, color_list, total_color_count):
+
+        color_to_remove = self.rng.randrange(total_color_count)
+        new_color_list = []
+
+        for c in color_list:
+            if c == color_to_remove:
+                # For each color equal to color_to_remove, set it to a random color from 0 to total_color_count - 2
+                new_color_list.append(self.rng.randrange(total_color_count - 1))
+            elif c > color_to_remove:
+                # Decrement the index for colors greater than color_to_remove
+                new_color_list.append(c - 1)
+            else:
+                # Keep the colors less than color_to_remove unchanged
+                new_color_list.append(c)
+
+        return new_color_list
+
+    # Select next node to change color
+    def select_next_node(self, state, tabu):
+        max_violation = float('-inf')
+        max_violation_node_list = []
+        violation = state.violation
+
+        # Only nodes with some violation are candidates
+        for node in state.conflicting:
+            # Skip nodes in tabu list and nodes of the fixed clique
+            if tabu.is_find(node) or node in self.fixed:
+                continue
+
+            # If violation is max violation, add the node to candidate list
+            if max_violation == violation[node]:
+                max_violation_node_list.append(node)
+
+            # If violation is bigger than max violation, clear the candidate list and add the node
+            elif max_violation < violation[node]:
+                max_violation = violation[node]
+                max_violation_node_list = [node]
+
+        # If no nodes with violations are available, select a random node from those in the tabu list
+        if not max_violation_node_list:
+            max_violation_node_list = [node for node in tabu.tabu_hash]
+
+        if not max_violation_node_list:
+            return -1
+
+        # Random sample a node from candidate list
+        return self.rng.choice(max_violation_node_list)
+
+    # Check feasibility of current number of colors
+    # Stops as soon as the coloring has no conflicts left
+    # The search gives up early when stop_event is set by another worker
+    def is_feasible(self, color_list, total_color_count, stop_event=None):
+
+        # Set the length of tabu list to 1/tabu_ratio_size of the number of nodes
+        tabu_size = max(int(self.graph.node_count / self.tabu_ratio_size), 1)
+
+        # one step means change the color of a node
+        step_count = 0
+
+        # The i-th node of the clique takes color i and keeps it
+        color_list[:] = fix_clique_colors(color_list, self.clique)
+
+        state = TabuState(self.adjacent_list, color_list, total_color_count, self.rng)
+
+        # Tabu hash table and tabu queue, they contain same data
+        # use hash table to accelerate retrieval, use queue to make the tabu list FIFO (First In First Out)
+        tabu = Tabu(tabu_size)
+
+        while step_count < self.step_limit and state.total_violation > 0:
 
-    # Random sample a node from candidate list
-    return choice(max_violation_node_list)
+            # Select next node to change color
+            node = self.select_next_node(state, tabu)
 
-# Check feasibility of current number of colors
-def is_feasible(adjacent_dict, color_list, total_color_count, tabu_size):
+            # If cannot select next node, maybe the tabu list is too long, then pop one element from the tabu list
+            while node == -1:
+                tabu.pop()
+                node = self.select_next_node(state, tabu)
 
-    # one step means change the color of a node
-    step_count = 0
+            # Add the selected node to tabu list
+            tabu.push(node)
 
-    violation_dict, total_violation = init_violation(adjacent_dict, color_list)
+            # Change color of the selected code
+            state.change_color(node)
 
-    # Tabu hash table and tabu queue, they contain same data
-    # use hash table to accelerate retrieval, use queue to make the tabu list FIFO (First In First Out)
-    tabu = Tabu(tabu_size)
+            step_count +=1
 
-    while step_count < step_limit and total_violation > 0:
-
-        # Select next node to change color
-        node = select_next_node(violation_dict, tabu)
-
-        # If cannot select next node, maybe the tabu list is too long, then pop one element from the tabu list
-        while node == -1:
-            tabu.pop()
-            node = select_next_node(violation_dict, tabu)
-        
-        # Add the selected node to tabu list
-        tabu.push(node)
+            if step_count % stop_check_interval == 0 and self.should_stop(stop_event):
+                break
 
-        # Change color of the selected code
-        change_color(node, adjacent_dict[node], color_list, total_color_count, violation_dict, total_violation)
-        
-        step_count +=1
+        return state.total_violation == 0, step_count
 
-    return total_violation == 0, step_count
+    # Check feasibility of current number of colors with the TabuCol engine
+    # Stops as soon as the coloring has no conflicts left
+    # The search gives up early when stop_event is set by another worker
+    def is_feasible_tabucol(self, color_list, total_color_count, stop_event=None):
 
-def save_solution(filename, feasible_color_count, feasible_color_list):
-    # Write the output to filename
-    with open(filename, "w") as f:
-        output_data = str(feasible_color_count) + ' ' + str(0) + '\n'
-        output_data += ' '.join(map(str, feasible_color_list))
-        output_data += '\n'
-        f.write(output_data)
-        f.close()
+        # one step means change the color of a node
+        step_count = 0
 
-# Search the minimum number of colors for a graph
-# Return the color choice of every node and the total number of colors
-def search(adjacent_dict, color_list, init_color_count,node_count):
+        # The i-th node of the clique takes color i and keeps it
+        color_list[:] = fix_clique_colors(color_list, self.clique)
 
-    # Set the length of tabu list to 1/tabu_ratio_size of the number of nodes
-    tabu_limit = max(int(node_count / tabu_ratio_size), 1)
+        state = TabuColState(
+            self.graph, color_list, total_color_count, self.rng,
+            self.tabucol_tenure_random, self.tabucol_tenure_ratio, self.movable
+        )
 
-    feasible_color_list = [-1]
-    feasible_color_count = -1
+        while step_count < self.step_limit and state.total_violation > 0:
 
-    for color_count in range(init_color_count, 1, -1):
-        # Times to retry if did not find feasible solution in a given number of steps.
-        retry_count = 0
+            node, new_color = state.best_move(step_count)
 
-        while True:
-            feasible, step_count = is_feasible(adjacent_dict, color_list, color_count, tabu_limit)
+            # If every move is tabu, move a random conflicting node to a random color
+            if node == -1:
+                node = self.rng.choice(np.flatnonzero((state.violation > 0) & self.movable).tolist())
+                new_color = self.rng.choice([c for c in range(total_color_count) if c != state.colors[node]])
 
-            if feasible:
-                #print(f"{color_count} colors is feasible, tried {step_count} step")
-                feasible_color_list = color_list
-                feasible_color_count = color_count
-                filename = str(color_count) + ".txt"
+            state.change_color(node, new_color, step_count)
 
-                save_solution(filename, feasible_color_count, feasible_color_list)
+            step_count +=1
 
-                color_list = remove_color(feasible_color_list, feasible_color_count)
+            if step_count % stop_check_interval == 0 and self.should_stop(stop_event):
                 break
 
-            retry_count +=1
-            if retry_count >= retry_limit:
-                 return feasible_color_list, feasible_color_count
-
-            #print(f"[Number of colors {color_count:4d}][Retry {retry_count:5d}] reinitializing color")
-            color_list = remove_color(feasible_color_list, feasible_color_count)
-
-    return feasible_color_list, feasible_color_count
+        # The search continues from the colors reached
+        color_list[:] = state.colors.tolist()
+
+        return state.total_violation == 0, step_count
+
+    # Search the minimum number of colors for a graph
+    # Return the color choice of every node and the total number of colors
+    def search(self, color_list, init_color_count):
+
+        feasible_color_list = [-1]
+        feasible_color_count = -1
+
+        # The initial coloring may have conflicts, retries of the first color count start again from it
+        start_color_list = list(color_list)
+
+        for color_count in range(init_color_count, self.lower_bound - 1, -1):
+            # Times to retry if did not find feasible solution in a given number of steps.
+            retry_count = 0
+
+            while True:
+                if self.use_tabucol:
+                    feasible, step_count = self.is_feasible_tabucol(color_list, color_count)
+                else:
+                    feasible, step_count = self.is_feasible(color_list, color_count)
+
+                if feasible:
+                    #print(f"{color_count} colors is feasible, tried {step_count} step")
+                    feasible_color_list = color_list
+                    feasible_color_count = color_count
+                    self.checkpoint.update(feasible_color_count, feasible_color_list)
+
+                    color_list = self.remove_color(feasible_color_list, feasible_color_count)
+                    break
+
+                retry_count +=1
+                if retry_count >= self.retry_limit or self.timed_out():
+                     return feasible_color_list, feasible_color_count
+
+                #print(f"[Number of colors {color_count:4d}][Retry {retry_count:5d}] reinitializing color")
+                if feasible_color_count == -1:
+                    color_list = list(start_color_list)
+                else:
+                    color_list = self.remove_color(feasible_color_list, feasible_color_count)
+
+        return feasible_color_list, feasible_color_count
+
+    # Search the minimum number of colors running retry_limit trajectories per color count on a process pool
+    # The first feasible trajectory stops the others and all the workers move on to one color less
+    def parallel_search(self, color_list, init_color_count, workers):
+
+        feasible_color_list = [-1]
+        feasible_color_count = -1
+        trajectory_seed = self.rng.randrange(2**32)
+
+        blocks, specs = share_graph(self.graph)
+        stop_event = Event()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_worker,
+                initargs=(self.graph.node_count, specs, self.parameters(), stop_event)
+            ) as executor:
+
+                # The initial coloring is the starting point of the first color count
+                start_color_list, start_color_count = color_list, init_color_count
+
+                for color_count in range(init_color_count, self.lower_bound - 1, -1):
+                    stop_event.clear()
+                    pending = set()
+                    submitted = 0
+                    found = None
+
+                    while found is None and (pending or submitted < self.retry_limit) and not self.timed_out():
+                        while submitted < self.retry_limit and len(pending) < workers:
+                            pending.add(executor.submit(
+                                run_trajectory, start_color_list, start_color_count, color_count, trajectory_seed
+                            ))
+                            trajectory_seed += 1
+                            submitted += 1
+
+                        timeout = None if self.deadline is None else max(self.deadline - perf_counter(), 0)
+                        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            feasible, trajectory_color_list = future.result()
+                            if feasible and found is None:
+                                found = trajectory_color_list
+
+                    # Stop the trajectories still running before moving on
+                    stop_event.set()
+                    for future in pending:
+                        future.cancel()
+                    wait(pending)
+
+                    if found is None:
+                        return feasible_color_list, feasible_color_count
+
+                    feasible_color_list = found
+                    feasible_color_count = color_count
+                    self.checkpoint.update(feasible_color_count, feasible_color_list)
+                    start_color_list, start_color_count = feasible_color_list, feasible_color_count
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        return feasible_color_list, feasible_color_count
+
+    def solve(self, color_list=None, init_color_count=None, workers=1):
+        """Searches the smallest number of colors for which a coloring is found
+
+        Parameters
+        ----------
+        color_list : List[int], optional
+            Initial coloring, by default a different color for every node
+
+        init_color_count : int, optional
+            Number of colors of the initial coloring, by default the number of nodes
+
+        workers : int, optional
+            Processes running independent trajectories, by default 1
+
+        Returns
+        -------
+        Tuple[List[int], int]
+            Color of every node and number of colors
+        """
+        if self.time_limit is not None:
+            self.deadline = perf_counter() + self.time_limit
+
+        if color_list is None:
+            init_color_count = self.graph.node_count
+            color_list = self.initialize_color(init_color_count)
+        else:
+            color_list = list(color_list)
+
+        # The checkpoint is written at least once, whatever the outcome of the search
+        with self.checkpoint:
+            # Independent trajectories run in parallel on several processes
+            if workers > 1:
+                return self.parallel_search(color_list, init_color_count, workers)
+            return self.search(color_list, init_color_count)
+
+# Solver of the current process of a pool, with the graph attached from shared memory
+worker_solver = None
+worker_memory = []
+worker_stop_event = None
+
+def share_graph(graph):
+    """Copies the CSR arrays of the graph into shared memory blocks
+
+    Returns
+    -------
+    Tuple[List[SharedMemory], List[Tuple[str, tuple, str]]]
+        The blocks, to be released by the caller, and the name, shape and dtype of every array
+    """
+    blocks = []
+    specs = []
+    for array in (graph.offsets, graph.indices, graph.degree):
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        specs.append((block.name, array.shape, array.dtype.str))
+    return blocks, specs
+
+def init_worker(node_count, specs, parameters, stop_event):
+    global worker_solver, worker_stop_event
+
+    arrays = []
+    for name, shape, dtype in specs:
+        block = SharedMemory(name=name)
+        worker_memory.append(block)
+        arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+    worker_solver = TabuColoring(Graph(node_count, *arrays), **parameters)
+    worker_stop_event = stop_event
+
+# One independent trajectory from the last feasible coloring, run in a worker
+def run_trajectory(feasible_color_list, feasible_color_count, color_count, trajectory_seed):
+    worker_solver.rng.seed(trajectory_seed)
+    if feasible_color_count == color_count:
+        color_list = list(feasible_color_list)
+    else:
+        color_list = worker_solver.remove_color(feasible_color_list, feasible_color_count)
+    if worker_solver.use_tabucol:
+        feasible, step_count = worker_solver.is_feasible_tabucol(color_list, color_count, worker_stop_event)
+    else:
+        feasible, step_count = worker_solver.is_feasible(color_list, color_count, worker_stop_event)
+    return feasible, color_list
 
-def solve_it(input_data,color_data = ""):
+# checkpoint_path keeps the best coloring found, which can be given back as color_data to resume
+# time_limit stops the search after that many seconds with the best coloring found
+def solve_it(input_data,color_data = "",workers = 1,seed = None,checkpoint_path = None,time_limit = None):
     # parse the input data
-    lines = input_data.split('\n')
-
-    first_line = lines[0].split()
-    node_count = int(first_line[0])
-    edge_count = int(first_line[1])
-
-    for i in range(1, edge_count + 1):
-        line = lines[i]
-        parts = line.split()
-        vs = int(parts[0])
-        ve = int(parts[1])
-        if vs in adjacent_dict:
-            adjacent_dict[vs].append(ve)
-        else:
-            adjacent_dict[vs] = [ve]
-        if ve in adjacent_dict:        
-            adjacent_dict[ve].append(vs)
-        else:
-            adjacent_dict[ve] = [vs]
+    graph = Graph.from_instance(input_data)
+    checkpoint = Checkpoint(checkpoint_path, checkpoint_interval)
+    tabu_coloring = TabuColoring(graph, seed=seed, checkpoint=checkpoint, time_limit=time_limit)
+
+    # Resume from the checkpoint of an earlier run
+    if color_data == "" and checkpoint.values is not None:
+        color_data = checkpoint.output_data
 
     if color_data == "":
-        color_list = initialize_color(node_count)
-        init_color_count = node_count
+        feasible_color_list, feasible_color_count = tabu_coloring.solve(workers=workers)
     else:
         # parse the color data if exists file with initial results
-        lines = color_data.split('\n')
+        init_color_count, _, color_list = parse_solution(color_data)
+        feasible_color_list, feasible_color_count = tabu_coloring.solve(
+            color_list.tolist(), int(init_color_count), workers=workers
+        )
 
-        first_line = lines[0].split()
-        init_color_count = int(first_line[0])
-        color_list = list(map(int, lines[1].split()))
-
-    feasible_color_list, feasible_color_count = search(adjacent_dict, color_list, init_color_count, node_count)
+    # The coloring is optimal when it uses as many colors as the clique has nodes
+    optimal = int(feasible_color_count == len(tabu_coloring.clique))
 
     # Prepare the solution in the specified output format
-    output_data = str(feasible_color_count) + ' ' + str(0) + '\n'
+    output_data = str(feasible_color_count) + ' ' + str(optimal) + '\n'
     output_data += ' '.join(map(str, feasible_color_list))
 
     return output_data
 
 if __name__ == '__main__':
-    import sys
-
-    if len(sys.argv) == 2:
-        data_file_location = sys.argv[1].strip()
-        with open(data_file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
-        print(solve_it(input_data))
-
-    elif len(sys.argv) == 3:
-        data_file_location = sys.argv[1].strip()
-        with open(data_file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
-
-        color_file_location = sys.argv[2].strip()
-        with open(color_file_location, 'r') as color_data_file:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Searches a coloring with few colors by tabu search")
+    parser.add_argument("location", help="instance file, such as ./data/gc_4_1")
+    parser.add_argument("color_location", nargs="?", help="file with a coloring to start from, such as the <instance>.tabu checkpoint")
+    parser.add_argument("--workers", type=int, default=1, help="processes running independent trajectories")
+    parser.add_argument("--time-limit", type=float, default=cli_time_limit, help="seconds of the search, 0 for no limit")
+    args = parser.parse_args()
+
+    data_file_location = args.location.strip()
+    input_data = read_instance(data_file_location)
+    color_data = ""
+    if args.color_location is not None:
+        with open(args.color_location.strip(), 'r') as color_data_file:
             color_data = color_data_file.read()
 
-        print(solve_it(input_data, color_data))
-    else:
-        print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/gc_4_1)')
-
+    # The best coloring is kept in <instance>.tabu, which can be given as second argument to resume the search
+    checkpoint_path = os.path.basename(data_file_location) + ".tabu"
+    time_limit = args.time_limit if args.time_limit > 0 else None
+    print(solve_it(input_data, color_data, args.workers, checkpoint_path=checkpoint_path, time_limit=time_limit))
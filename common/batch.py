@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sqlite3
+import sys
+import zipfile
+from multiprocessing import get_context
+from multiprocessing.connection import wait
+from time import perf_counter, time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.benchmark import compare, parse_param, problem_of, run_once, solver_module
+from common.cache import instance_digest
+from common.loader import parse_solution, read_instance, split_zip_path
+
+# Default file of the result store
+store_path = "results.sqlite"
+# Instances solved at the same time, each in its own process
+workers = os.cpu_count() or 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    instance_hash TEXT NOT NULL,
+    solver TEXT NOT NULL,
+    params TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    instance TEXT NOT NULL,
+    status TEXT NOT NULL,
+    obj REAL,
+    opt INTEGER,
+    time REAL,
+    peak_rss INTEGER,
+    timeout REAL,
+    output TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    PRIMARY KEY (instance_hash, solver, params, seed)
+);
+CREATE INDEX IF NOT EXISTS results_instance ON results (instance_hash, opt);
+"""
+
+
+class ResultStore:
+
+    path: str
+    connection: sqlite3.Connection
+
+    def __init__(self, path: str = store_path):
+        """SQLite table of solver results, one row per instance, solver, parameters and seed
+
+        The instance is identified by the hash of its contents, so renamed or zipped
+        copies share their results. A row only gets replaced by a better result, and a
+        result that timed out or failed never replaces a solution.
+
+        Parameters
+        ----------
+        path : str, optional
+            File of the database, by default "results.sqlite"
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def __repr__(self) -> str:
+        return f"ResultStore(path={self.path})"
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *args):
+        self.connection.close()
+
+    def get(self, instance_hash: str, solver: str, params: str, seed: int) -> Optional[sqlite3.Row]:
+        return self.connection.execute(
+            "SELECT * FROM results WHERE instance_hash = ? AND solver = ? AND params = ? AND seed = ?",
+            (instance_hash, solver, params, seed)
+        ).fetchone()
+
+    def is_optimal(self, instance_hash: str) -> bool:
+        """Either or not some solver proved a solution of the instance optimal"""
+        return self.connection.execute(
+            "SELECT 1 FROM results WHERE instance_hash = ? AND opt = 1 LIMIT 1", (instance_hash,)
+        ).fetchone() is not None
+
+    def record(self, row: Dict[str, Any]) -> bool:
+        """Stores a result unless the one of the same key is at least as good
+
+        Returns
+        -------
+        bool
+            Either or not the result was stored
+        """
+        previous = self.get(row["instance_hash"], row["solver"], row["params"], row["seed"])
+        if previous is not None and previous["status"] == "done":
+            if row["status"] != "done":
+                return False
+            better = compare(row["obj"], previous["obj"], problem_of(row["instance"])[0]) == "better"
+            if not better and not (row["opt"] and not previous["opt"]):
+                return False
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" * len(row))
+        with self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO results ({columns}) VALUES ({placeholders})", tuple(row.values())
+            )
+        return True
+
+
+def expand_instances(pattern: str) -> Iterator[Tuple[str, str]]:
+    """Name and path of the instances matching a glob, which may go through a zip archive
+
+    Parameters
+    ----------
+    pattern : str
+        Glob such as `coloring/data/gc_*` or `coloring/data/data.zip/gc_*`
+
+    Yields
+    ------
+    Tuple[str, str]
+        Name of every instance and the path `read_instance` takes
+    """
+    archive, member = split_zip_path(pattern)
+    if member:
+        with zipfile.ZipFile(archive) as bundle:
+            names = sorted(info.filename for info in bundle.infolist() if not info.is_dir())
+        for name in fnmatch.filter(names, member):
+            yield os.path.basename(name), os.path.join(archive, name)
+        return
+    for path in sorted(glob.glob(pattern)):
+        if os.path.isfile(path) and not zipfile.is_zipfile(path):
+            yield os.path.basename(path), path
+
+def run_task(connection, module_name: str, input_data: bytes, params: Dict[str, Any], seed: int):
+    """Runs a solver in a child process of `run_batch` and sends back its result or error"""
+    try:
+        connection.send(("done", run_once(module_name, input_data, params, seed)))
+    except Exception as e:
+        connection.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+def skip_reason(
+    store: ResultStore, instance_hash: str, key: Tuple[str, str, int], timeout: Optional[float]
+) -> Optional[str]:
+    """Why an instance needs no new run, None when it does
+
+    An instance is skipped when some solver proved it optimal, when the same solver
+    and parameters already solved it, or when they timed out within a timeout at least
+    as long as this one. Failed runs are retried.
+    """
+    if store.is_optimal(instance_hash):
+        return "optimal"
+    previous = store.get(instance_hash, *key)
+    if previous is None:
+        return None
+    if previous["status"] == "done":
+        return "solved"
+    if previous["status"] == "timeout" and timeout is not None and previous["timeout"] >= timeout:
+        return "timed out"
+    return None
+
+def run_batch(
+    solver: str,
+    pattern: str,
+    store: ResultStore,
+    params: Optional[Dict[str, Any]] = None,
+    seed: int = 0,
+    timeout: Optional[float] = None,
+    workers: int = workers,
+    force: bool = False
+) -> List[Dict[str, Any]]:
+    """Solves the instances matching a glob in a pool of processes and stores the results
+
+    Every instance runs in a new process, stopped after `timeout` seconds. Instances
+    that already have a result of equal or better quality in the store are skipped.
+
+    Parameters
+    ----------
+    solver : str
+        Solver file or module, such as `coloring/tabu/solver.py`
+
+    pattern : str
+        Glob of the instances, such as `coloring/data/gc_*`
+
+    store : ResultStore
+        Store of the results
+
+    params : Optional[Dict[str, Any]], optional
+        Keyword arguments of `solve_it`, by default None
+
+    seed : int, optional
+        Seed of the random generators of the runs, by default 0
+
+    timeout : Optional[float], optional
+        Seconds after which a run is stopped, by default None
+
+    workers : int, optional
+        Runs at the same time, by default the number of CPUs
+
+    force : bool, optional
+        Either or not to run the instances even when the store has results for them, by default False
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Rows of the runs done, in the order they ended
+    """
+    module_name = solver_module(solver)
+    params = params or {}
+    params_key = json.dumps(params, sort_keys=True)
+    ctx = get_context("spawn")
+
+    tasks = []
+    for name, path in expand_instances(pattern):
+        input_data = read_instance(path)
+        instance_hash = instance_digest(input_data)
+        reason = None if force else skip_reason(store, instance_hash, (module_name, params_key, seed), timeout)
+        if reason is not None:
+            print(f"{name}: skipped, {reason}", file=sys.stderr)
+            continue
+        tasks.append((name, instance_hash, input_data))
+    tasks.reverse()
+
+    rows = []
+    running = {}
+    while tasks or running:
+        while tasks and len(running) < workers:
+            name, instance_hash, input_data = tasks.pop()
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=run_task, args=(sender, module_name, input_data, params, seed))
+            process.start()
+            sender.close()
+            deadline = perf_counter() + timeout if timeout is not None else None
+            running[receiver] = (process, name, instance_hash, deadline)
+
+        deadlines = [deadline for _, _, _, deadline in running.values() if deadline is not None]
+        wait_time = max(min(deadlines) - perf_counter(), 0.0) if deadlines else None
+        ready = wait(list(running), wait_time)
+
+        now = perf_counter()
+        for receiver in list(running):
+            process, name, instance_hash, deadline = running[receiver]
+            if receiver in ready:
+                try:
+                    status, result = receiver.recv()
+                except EOFError:
+                    status, result = "error", f"process ended with exit code {process.exitcode}"
+            elif deadline is not None and now >= deadline:
+                process.terminate()
+                status, result = "timeout", None
+            else:
+                continue
+            process.join()
+            receiver.close()
+            del running[receiver]
+
+            row = {
+                "instance_hash": instance_hash, "solver": module_name, "params": params_key, "seed": seed,
+                "instance": name, "status": status, "obj": None, "opt": None, "time": None, "peak_rss": None,
+                "timeout": timeout, "output": None, "error": result if status == "error" else None,
+                "created": time(),
+            }
+            if status == "done":
+                row["output"], row["time"], row["peak_rss"] = result
+                try:
+                    obj, opt, _ = parse_solution(row["output"])
+                    row["obj"], row["opt"] = obj, opt
+                except ValueError as e:
+                    row["status"], row["error"] = "error", f"ValueError: {e}"
+            store.record(row)
+            rows.append(row)
+            print(format_result(row), file=sys.stderr)
+
+    return rows
+
+def format_result(row: Dict[str, Any]) -> str:
+    if row["status"] == "done":
+        return f"{row['instance']}: obj {row['obj']:.10g} opt {row['opt']}, {row['time']:.3f} s"
+    if row["status"] == "timeout":
+        return f"{row['instance']}: timed out after {row['timeout']:g} s"
+    return f"{row['instance']}: {row['error']}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves a batch of instances in parallel into a result store")
+    parser.add_argument("solver", help="solver file or module, such as coloring/tabu/solver.py")
+    parser.add_argument("pattern", help="glob of the instances, such as 'coloring/data/gc_*'")
+    parser.add_argument("--store", default=store_path, help="SQLite file of the results")
+    parser.add_argument("--param", action="append", default=[], help="keyword argument of solve_it as key=value")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, help="seconds after which a run is stopped")
+    parser.add_argument("--workers", type=int, default=workers)
+    parser.add_argument("--force", action="store_true", help="run the instances that already have results")
+    args = parser.parse_args()
+
+    params = dict(parse_param(text) for text in args.param)
+    with ResultStore(args.store) as store:
+        rows = run_batch(args.solver, args.pattern, store, params, args.seed, args.timeout, args.workers, args.force)
+    counts = {status: sum(row["status"] == status for row in rows) for status in ("done", "timeout", "error")}
+    print(f"{len(rows)} runs: {counts['done']} solved, {counts['timeout']} timed out, {counts['error']} failed")
@@ -0,0 +1,338 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import argparse
+import ast
+import csv
+import fnmatch
+import importlib
+import inspect
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, ROOT_DIR)
+
+from common.loader import iter_instances, parse_solution, read_instance
+
+# Runs of every instance, the n-th one with seed base_seed + n
+repetitions = 3
+base_seed = 0
+# Relative slowdown or memory growth over the baseline flagged as a regression
+time_tolerance = 0.25
+memory_tolerance = 0.25
+# Slowdowns below this number of seconds are timing noise
+time_floor = 0.05
+
+# Either or not the objective is minimized, and directories of the reference outputs, by instance prefix
+REFERENCES = {
+    "gc": (True, ["coloring/dsatur"]),
+    "ks": (False, ["knapsack/branch_and_bound", "knapsack/or_branch_and_bound"]),
+    "fl": (True, []),
+}
+
+# Columns of the result table, one row per run
+FIELDS = ["instance", "repetition", "seed", "time", "peak_rss", "obj", "opt", "reference", "status", "error"]
+
+def solver_module(solver: str) -> str:
+    """Module name of a solver given as `coloring/dsatur/solver.py` or `coloring.dsatur.solver`"""
+    if solver.endswith(".py"):
+        path = os.path.relpath(os.path.abspath(solver), ROOT_DIR)
+        return path[:-len(".py")].replace(os.sep, ".")
+    return solver
+
+def default_location(module_name: str) -> str:
+    """Data directory of the problem of a solver, such as `coloring/data` for `coloring.dsatur.solver`"""
+    return os.path.join(ROOT_DIR, module_name.split(".")[0], "data")
+
+def peak_rss() -> int:
+    """Peak resident set size of the current process in bytes"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes and macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def run_once(module_name: str, input_data: bytes, params: Dict[str, Any], seed: int) -> Tuple[str, float, int]:
+    """Runs `solve_it` of a solver once, in a fresh process started by `benchmark`
+
+    The global random generators are seeded, and so is `solve_it` when it takes a `seed`.
+
+    Returns
+    -------
+    Tuple[str, float, int]
+        Output of the solver, seconds spent in `solve_it` and peak RSS of the process in bytes
+    """
+    solve_it = importlib.import_module(module_name).solve_it
+    random.seed(seed)
+    np.random.seed(seed)
+    params = dict(params)
+    if "seed" in inspect.signature(solve_it).parameters:
+        params.setdefault("seed", seed)
+
+    start = perf_counter()
+    output_data = solve_it(input_data, **params)
+    elapsed = perf_counter() - start
+    return output_data, elapsed, peak_rss()
+
+def problem_of(name: str) -> Tuple[bool, List[str]]:
+    return REFERENCES.get(name.split("_")[0], (True, []))
+
+def reference_objective(name: str) -> Optional[float]:
+    """Best objective among the reference outputs of an instance, None when there is none"""
+    minimize, directories = problem_of(name)
+    objectives = []
+    for directory in directories:
+        directory = os.path.join(ROOT_DIR, directory)
+        for file_name in sorted(os.listdir(directory)):
+            stem, extension = os.path.splitext(file_name)
+            if stem != name or extension == ".py":
+                continue
+            try:
+                objectives.append(parse_solution(read_instance(os.path.join(directory, file_name)))[0])
+            except ValueError:
+                # Some reference files are empty, the run that wrote them having failed
+                continue
+    if not objectives:
+        return None
+    return min(objectives) if minimize else max(objectives)
+
+def compare(obj: Optional[float], reference: Optional[float], minimize: bool) -> str:
+    """`better`, `equal` or `worse` than the reference, empty when one of them is missing"""
+    if obj is None or reference is None:
+        return ""
+    if abs(obj - reference) <= 1e-6 * max(1.0, abs(reference)):
+        return "equal"
+    return "better" if (obj < reference) == minimize else "worse"
+
+def benchmark(
+    solver: str,
+    locations: List[str],
+    pattern: str = "*",
+    repetitions: int = repetitions,
+    seed: int = base_seed,
+    params: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Runs a solver on every instance of some data directories or zip bundles
+
+    Every run takes place in a new process, one after the other, so the peak RSS
+    only counts that run and the timings do not compete for the CPU.
+
+    Parameters
+    ----------
+    solver : str
+        Solver file or module, such as `coloring/dsatur/solver.py`
+
+    locations : List[str]
+        Data directories, `data.zip` bundles or single instances
+
+    pattern : str, optional
+        Glob on the names of the instances, by default "*"
+
+    repetitions : int, optional
+        Runs of every instance, by default 3
+
+    seed : int, optional
+        Seed of the first run, incremented at every repetition, by default 0
+
+    params : Optional[Dict[str, Any]], optional
+        Keyword arguments of `solve_it`, by default None
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        One row per run with the columns of `FIELDS`
+    """
+    module_name = solver_module(solver)
+    params = params or {}
+    runs = []
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn"), max_tasks_per_child=1) as pool:
+        for location in locations:
+            for name, input_data in iter_instances(location):
+                if not fnmatch.fnmatch(name, pattern):
+                    continue
+                minimize = problem_of(name)[0]
+                reference = reference_objective(name)
+                for repetition in range(repetitions):
+                    row = {
+                        "instance": name, "repetition": repetition, "seed": seed + repetition,
+                        "time": None, "peak_rss": None, "obj": None, "opt": None,
+                        "reference": reference, "status": "", "error": "",
+                    }
+                    try:
+                        output_data, row["time"], row["peak_rss"] = pool.submit(
+                            run_once, module_name, input_data, params, seed + repetition
+                        ).result()
+                        row["obj"], row["opt"], _ = parse_solution(output_data)
+                        row["status"] = compare(row["obj"], reference, minimize)
+                    except Exception as e:
+                        row["error"] = f"{type(e).__name__}: {e}"
+                    runs.append(row)
+                    print(format_row(row), file=sys.stderr)
+    return runs
+
+def format_row(row: Dict[str, Any]) -> str:
+    if row["error"]:
+        return f"{row['instance']} #{row['repetition']}: {row['error']}"
+    return (
+        f"{row['instance']} #{row['repetition']}: obj {row['obj']:.10g} opt {row['opt']} "
+        f"({row['status'] or 'no reference'}), {row['time']:.3f} s, {row['peak_rss'] / 2**20:.1f} MiB"
+    )
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Median time, largest peak RSS and best objective of every instance over its runs"""
+    grouped = {}
+    for row in runs:
+        grouped.setdefault(row["instance"], []).append(row)
+
+    summary = {}
+    for name, rows in grouped.items():
+        minimize = problem_of(name)[0]
+        done = [row for row in rows if not row["error"]]
+        objectives = [row["obj"] for row in done]
+        best = (min(objectives) if minimize else max(objectives)) if objectives else None
+        summary[name] = {
+            "time": statistics.median(row["time"] for row in done) if done else None,
+            "peak_rss": max(row["peak_rss"] for row in done) if done else None,
+            "obj": best,
+            "opt": max(row["opt"] for row in done) if done else None,
+            "reference": rows[0]["reference"],
+            "status": compare(best, rows[0]["reference"], minimize),
+            "errors": len(rows) - len(done),
+        }
+    return summary
+
+def find_regressions(
+    summary: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    time_tolerance: float = time_tolerance,
+    memory_tolerance: float = memory_tolerance
+) -> List[str]:
+    """Instances whose objective, time or memory got worse than in a previous run
+
+    Parameters
+    ----------
+    summary : Dict[str, Dict[str, Any]]
+        Summary of the current run, from `summarize`
+
+    baseline : Dict[str, Dict[str, Any]]
+        Summary of the previous run
+
+    time_tolerance : float, optional
+        Relative slowdown allowed, by default 0.25
+
+    memory_tolerance : float, optional
+        Relative growth of the peak RSS allowed, by default 0.25
+
+    Returns
+    -------
+    List[str]
+        Description of every regression
+    """
+    regressions = []
+    for name, current in summary.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["errors"] and not previous["errors"]:
+            regressions.append(f"{name}: {current['errors']} failed runs")
+        if compare(current["obj"], previous["obj"], problem_of(name)[0]) == "worse":
+            regressions.append(f"{name}: objective {current['obj']:.10g} instead of {previous['obj']:.10g}")
+        if current["opt"] is not None and previous["opt"] and not current["opt"]:
+            regressions.append(f"{name}: optimality no longer proven")
+        if current["time"] is not None and previous["time"] is not None:
+            slowdown = current["time"] - previous["time"]
+            if slowdown > time_floor and slowdown > time_tolerance * previous["time"]:
+                regressions.append(f"{name}: {current['time']:.3f} s instead of {previous['time']:.3f} s")
+        if current["peak_rss"] is not None and previous["peak_rss"] is not None:
+            if current["peak_rss"] > (1 + memory_tolerance) * previous["peak_rss"]:
+                regressions.append(
+                    f"{name}: peak RSS {current['peak_rss'] / 2**20:.1f} MiB "
+                    f"instead of {previous['peak_rss'] / 2**20:.1f} MiB"
+                )
+    return regressions
+
+def write_results(path: str, runs: List[Dict[str, Any]], metadata: Dict[str, Any]):
+    """Writes the runs as a CSV table when `path` ends with `.csv`, otherwise as JSON with their summary"""
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(runs)
+    else:
+        with open(path, "w") as f:
+            json.dump(dict(metadata, runs=runs, summary=summarize(runs)), f, indent=2)
+
+def read_results(path: str) -> List[Dict[str, Any]]:
+    """Reads back the runs written by `write_results`"""
+    if not path.endswith(".csv"):
+        with open(path) as f:
+            return json.load(f)["runs"]
+
+    def number(text):
+        return float(text) if text else None
+
+    with open(path, newline="") as f:
+        return [
+            dict(
+                row, repetition=int(row["repetition"]), seed=int(row["seed"]), time=number(row["time"]),
+                peak_rss=number(row["peak_rss"]), obj=number(row["obj"]), opt=number(row["opt"]),
+                reference=number(row["reference"])
+            )
+            for row in csv.DictReader(f)
+        ]
+
+def parse_param(text: str) -> Tuple[str, Any]:
+    """Parses a `key=value` argument of `solve_it`, the value being a Python literal or a string"""
+    key, _, value = text.partition("=")
+    try:
+        return key, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return key, value
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the solve_it of a solver over a set of instances")
+    parser.add_argument("solver", help="solver file or module, such as coloring/dsatur/solver.py")
+    parser.add_argument("locations", nargs="*", help="data directories or zip bundles, by default the data of the problem")
+    parser.add_argument("--pattern", default="*", help="glob on the instance names, such as 'gc_50_*'")
+    parser.add_argument("--repetitions", type=int, default=repetitions)
+    parser.add_argument("--seed", type=int, default=base_seed)
+    parser.add_argument("--param", action="append", default=[], help="keyword argument of solve_it as key=value")
+    parser.add_argument("--output", help="result file, CSV when it ends with .csv and JSON otherwise")
+    parser.add_argument("--baseline", help="results of a previous run to check for regressions")
+    args = parser.parse_args()
+
+    params = dict(parse_param(text) for text in args.param)
+    locations = args.locations or [default_location(solver_module(args.solver))]
+    runs = benchmark(args.solver, locations, args.pattern, args.repetitions, args.seed, params)
+    summary = summarize(runs)
+
+    print(f"{'instance':<16}{'time (s)':>10}{'RSS (MiB)':>11}{'obj':>14}{'opt':>5}{'reference':>14}  status")
+    for name, result in summary.items():
+        if result["time"] is None:
+            print(f"{name:<16}{'failed':>10}")
+            continue
+        reference = "" if result["reference"] is None else f"{result['reference']:.10g}"
+        print(
+            f"{name:<16}{result['time']:>10.3f}{result['peak_rss'] / 2**20:>11.1f}"
+            f"{result['obj']:>14.10g}{result['opt']:>5}{reference:>14}  {result['status']}"
+        )
+
+    if args.output:
+        metadata = {"solver": solver_module(args.solver), "params": params, "seed": args.seed}
+        write_results(args.output, runs, metadata)
+
+    if args.baseline:
+        regressions = find_regressions(summary, summarize(read_results(args.baseline)))
+        for regression in regressions:
+            print("Regression " + regression)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,130 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+
+Text = Union[str, bytes]
+
+# Bump when the layout of the cached arrays changes, so older entries are ignored
+CACHE_VERSION = 2
+# File of an entry listing its arrays, written last
+MANIFEST = "arrays.txt"
+
+# Directory holding the cached instances, set the variable to an empty string to disable the cache
+CACHE_DIR = os.environ.get(
+    "OPTIMIZATION_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "optimization")
+)
+
+def instance_digest(input_data: Text) -> str:
+    """SHA-1 of the contents of an instance, which names it whatever its file is called"""
+    if isinstance(input_data, str):
+        input_data = input_data.encode()
+    return hashlib.sha1(input_data).hexdigest()
+
+def instance_key(input_data: Text, kind: str) -> str:
+    """Key of an instance in the cache, derived from the hash of its contents
+
+    A change in the text of the instance gives a different key, so stale entries
+    are never read back.
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of the instance file
+
+    kind : str
+        Name of the preprocessing stored for the instance, such as `graph` or `knapsack`
+
+    Returns
+    -------
+    str
+        Name of the cache entry
+    """
+    return f"{kind}-v{CACHE_VERSION}-{instance_digest(input_data)}"
+
+def load_entry(key: str, cache_dir: str) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-maps the arrays of a cache entry, or returns None when it does not exist
+
+    An entry missing its manifest or one of the arrays it lists is a miss, like
+    an entry of other contents, and is built again.
+    """
+    path = os.path.join(cache_dir, key)
+    if not os.path.isdir(path):
+        return None
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            names = f.read().split()
+        return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode='r') for name in names}
+    except (OSError, ValueError):
+        return None
+
+def save_entry(key: str, arrays: Dict[str, np.ndarray], cache_dir: str):
+    """Writes the arrays of a cache entry as `.npy` files, followed by their manifest
+
+    The entry is written in a temporary directory and renamed at the end, so a
+    concurrent reader never sees it half written.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=key + ".", dir=cache_dir)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, name + ".npy"), np.ascontiguousarray(array))
+        with open(os.path.join(tmp_path, MANIFEST), "w") as f:
+            f.write("\n".join(arrays))
+        os.rename(tmp_path, os.path.join(cache_dir, key))
+    except OSError:
+        # Another process stored the same entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def cached_arrays(
+    input_data: Text,
+    kind: str,
+    build: Callable[[Text], Dict[str, np.ndarray]],
+    cache_dir: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """Returns the preprocessed arrays of an instance, building them only on the first call
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of the instance file
+
+    kind : str
+        Name of the preprocessing, it must change whenever `build` does
+
+    build : Callable[[Text], Dict[str, np.ndarray]]
+        Parses and preprocesses the instance into named arrays
+
+    cache_dir : Optional[str], optional
+        Directory of the cache, by default `CACHE_DIR`
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        Arrays returned by `build`, read-only memory maps when they come from the cache
+    """
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    if not cache_dir:
+        return build(input_data)
+
+    key = instance_key(input_data, kind)
+    arrays = load_entry(key, cache_dir)
+    if arrays is not None:
+        return arrays
+
+    # A broken entry is replaced by the one built now
+    shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+    arrays = build(input_data)
+    try:
+        save_entry(key, arrays, cache_dir)
+    except OSError:
+        # A read-only cache only costs the preprocessing time
+        pass
+    return arrays
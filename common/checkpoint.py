@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+from time import time
+from typing import Optional, Sequence
+
+from common.loader import parse_solution
+
+
+class Checkpoint:
+
+    path: Optional[str]
+    interval: float
+    obj: Optional[float]
+    opt: int
+    values: Optional[Sequence[int]]
+
+    def __init__(self, path: Optional[str] = None, interval: float = 10.0, minimize: bool = True):
+        """Best solution of a search, kept in memory and written to disk from time to time
+
+        The file uses the two-line output format of the solvers, so it can be given back
+        to them as an initial solution to resume the search. An existing file is read
+        first, and only replaced by better solutions.
+
+        Parameters
+        ----------
+        path : Optional[str], optional
+            File of the checkpoint, by default None to keep it in memory only
+
+        interval : float, optional
+            Minimum number of seconds between two writes, by default 10.0
+
+        minimize : bool, optional
+            Either or not lower objective values are better, by default True
+        """
+        self.path = path
+        self.interval = interval
+        self.minimize = minimize
+        self.obj = None
+        self.opt = 0
+        self.values = None
+        self.dirty = False
+        self.last_flush = time()
+        if path is not None and os.path.isfile(path):
+            self.load()
+
+    def __repr__(self) -> str:
+        return f"Checkpoint(obj={self.obj}, path={self.path})"
+
+    def __enter__(self) -> 'Checkpoint':
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def load(self):
+        """Reads the solution stored in the checkpoint file"""
+        with open(self.path, 'r') as f:
+            obj, self.opt, values = parse_solution(f.read())
+        self.obj = int(obj) if obj.is_integer() else obj
+        self.values = values.tolist()
+
+    def improves(self, obj: float) -> bool:
+        if self.obj is None:
+            return True
+        return obj < self.obj if self.minimize else obj > self.obj
+
+    def update(self, obj: float, values: Sequence[int], opt: int = 0) -> bool:
+        """Keeps a solution if it is better than the current one
+
+        The file is rewritten when the last write is older than `interval` seconds.
+
+        Parameters
+        ----------
+        obj : float
+            Objective value
+
+        values : Sequence[int]
+            Values of the solution line
+
+        opt : int, optional
+            1 if the solution is proven optimal, by default 0
+
+        Returns
+        -------
+        bool
+            Either or not the solution was kept
+        """
+        if not self.improves(obj) and not (opt and obj == self.obj):
+            return False
+        self.obj = obj
+        self.opt = opt
+        self.values = list(values)
+        self.dirty = True
+        if time() - self.last_flush >= self.interval:
+            self.flush()
+        return True
+
+    @property
+    def output_data(self) -> str:
+        output_data = str(self.obj) + ' ' + str(self.opt) + '\n'
+        output_data += ' '.join(map(str, self.values))
+        return output_data
+
+    def flush(self):
+        """Writes the best solution if it changed since the last write
+
+        The solution goes to a temporary file in the same directory which then replaces
+        the checkpoint, so readers never see a partial file.
+        """
+        self.last_flush = time()
+        if not self.dirty or self.path is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.output_data + '\n')
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.dirty = False
@@ -0,0 +1,217 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import warnings
+import zipfile
+from typing import Iterator, Tuple, Union
+
+import numpy as np
+
+Text = Union[str, bytes]
+
+def parse_numbers(input_data: Text, dtype: type = np.int64) -> np.ndarray:
+    """Parses every whitespace separated number of an instance in a single pass
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of an instance file
+
+    dtype : type, optional
+        Type of the numbers, by default np.int64
+
+    Returns
+    -------
+    np.ndarray
+        Flat array of `dtype` values
+    """
+    kind = "integer" if np.issubdtype(dtype, np.integer) else "real"
+    # Depending on its version NumPy warns or raises when the text holds something else than numbers
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(input_data, dtype=dtype, sep=' ')
+        except (DeprecationWarning, ValueError):
+            raise ValueError(f"The instance must only contain {kind} numbers") from None
+
+def parse_body(input_data: Text, count_position: int, row_size: int, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Splits an instance into its two-number header and a table of `row_size` columns
+
+    Raises ValueError when the body does not hold the number of rows announced
+    at `count_position` in the header.
+    """
+    numbers = parse_numbers(input_data)
+    if len(numbers) < 2:
+        raise ValueError("The first line must contain two numbers")
+    header = numbers[:2]
+    row_count = int(header[count_position])
+    body = numbers[2:]
+    if len(body) != row_count * row_size:
+        raise ValueError(
+            f"Wrong number of {name} specified: header says {row_count}, "
+            f"file has {len(body) / row_size:g}"
+        )
+    return header, body.reshape(row_count, row_size)
+
+def parse_coloring(input_data: Text) -> Tuple[int, np.ndarray]:
+    """Parses a gc_* graph coloring instance
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of the instance file
+
+    Returns
+    -------
+    Tuple[int, np.ndarray]
+        Node count and array of shape (|E|, 2) with the edges
+    """
+    header, edges = parse_body(input_data, 1, 2, "edges")
+    node_count = int(header[0])
+    if edges.size and (edges.min() < 0 or edges.max() >= node_count):
+        raise ValueError("Wrong number of nodes specified")
+    return node_count, edges.astype(np.int32)
+
+def parse_knapsack(input_data: Text) -> Tuple[int, np.ndarray, np.ndarray]:
+    """Parses a ks_* knapsack instance
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of the instance file
+
+    Returns
+    -------
+    Tuple[int, np.ndarray, np.ndarray]
+        Capacity, values and weights of the items
+    """
+    header, items = parse_body(input_data, 0, 2, "items")
+    capacity = int(header[1])
+    return capacity, np.ascontiguousarray(items[:, 0]), np.ascontiguousarray(items[:, 1])
+
+def parse_facility(input_data: Text) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Parses a fl_* facility location instance
+
+    Parameters
+    ----------
+    input_data : Text
+        Contents of the instance file
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+        Setup cost, capacity and location (|N|, 2) of the facilities, then demand and
+        location (|M|, 2) of the customers
+    """
+    numbers = parse_numbers(input_data, np.float64)
+    if len(numbers) < 2:
+        raise ValueError("The first line must contain two numbers")
+    facility_count, customer_count = int(numbers[0]), int(numbers[1])
+    body = numbers[2:]
+    if len(body) != 4 * facility_count + 3 * customer_count:
+        raise ValueError(
+            f"Wrong number of facilities and customers specified: header says "
+            f"{facility_count} and {customer_count}, file has {len(body)} numbers"
+        )
+    facilities = body[:4 * facility_count].reshape(facility_count, 4)
+    customers = body[4 * facility_count:].reshape(customer_count, 3)
+    return (
+        np.ascontiguousarray(facilities[:, 0]),
+        np.ascontiguousarray(facilities[:, 1]),
+        np.ascontiguousarray(facilities[:, 2:]),
+        np.ascontiguousarray(customers[:, 0]),
+        np.ascontiguousarray(customers[:, 1:]),
+    )
+
+def split_zip_path(file_location: str) -> Tuple[str, str]:
+    """Splits a path like `data/data.zip/gc_4_1` into the archive and the member name
+
+    Returns an empty member name when the path does not go through a zip archive.
+    """
+    archive = file_location
+    member = ""
+    while archive and not os.path.exists(archive):
+        archive, name = os.path.split(archive)
+        member = name if not member else name + "/" + member
+    if member and zipfile.is_zipfile(archive):
+        return archive, member
+    return file_location, ""
+
+def read_instance(file_location: str) -> bytes:
+    """Reads an instance file, either plain or stored inside a zip bundle
+
+    Parameters
+    ----------
+    file_location : str
+        Path to the file, or to a member of a zip archive such as `data/data.zip/gc_4_1`
+
+    Returns
+    -------
+    bytes
+        Raw contents of the instance
+    """
+    archive, member = split_zip_path(file_location)
+    if member:
+        with zipfile.ZipFile(archive) as bundle:
+            return bundle.read(member)
+    with open(file_location, 'rb') as input_data_file:
+        return input_data_file.read()
+
+def iter_instances(file_location: str) -> Iterator[Tuple[str, bytes]]:
+    """Iterates over the instances of a zip bundle, a directory or a single file
+
+    Parameters
+    ----------
+    file_location : str
+        Path to a `data.zip` bundle, a data directory or a single instance
+
+    Yields
+    ------
+    Tuple[str, bytes]
+        Name and raw contents of every instance
+    """
+    if os.path.isdir(file_location):
+        for name in sorted(os.listdir(file_location)):
+            path = os.path.join(file_location, name)
+            if os.path.isfile(path) and not zipfile.is_zipfile(path):
+                yield name, read_instance(path)
+    elif zipfile.is_zipfile(file_location):
+        with zipfile.ZipFile(file_location) as bundle:
+            for info in bundle.infolist():
+                if not info.is_dir():
+                    yield os.path.basename(info.filename), bundle.read(info)
+    else:
+        yield os.path.basename(file_location), read_instance(file_location)
+
+def load_coloring(file_location: str) -> Tuple[int, np.ndarray]:
+    return parse_coloring(read_instance(file_location))
+
+def load_knapsack(file_location: str) -> Tuple[int, np.ndarray, np.ndarray]:
+    return parse_knapsack(read_instance(file_location))
+
+def load_facility(file_location: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return parse_facility(read_instance(file_location))
+
+def parse_solution(output_data: Text) -> Tuple[float, int, np.ndarray]:
+    """Parses the two-line output of a solver, such as the `.dsa` or `.bnb` files
+
+    Parameters
+    ----------
+    output_data : Text
+        Contents of the solution file
+
+    Returns
+    -------
+    Tuple[float, int, np.ndarray]
+        Objective value, optimality flag and the values of the solution line
+    """
+    if isinstance(output_data, bytes):
+        output_data = output_data.decode()
+    lines = output_data.strip().split('\n')
+    first_line = lines[0].split()
+    if len(lines) < 2 or len(first_line) != 2:
+        raise ValueError("The solution must contain the objective line and the values line")
+    obj = float(first_line[0])
+    values = parse_numbers(lines[1])
+    return obj, int(first_line[1]), values
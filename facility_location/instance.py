@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.cache import cached_arrays
+from common.loader import Text, parse_facility
+
+# Largest number of facility-customer pairs whose coordinate differences are computed at once
+distance_chunk_cells = 2**24
+
+
+class FacilityInstance:
+
+    setup: np.ndarray
+    capacity: np.ndarray
+    facility_xy: np.ndarray
+    demand: np.ndarray
+    customer_xy: np.ndarray
+
+    def __init__(
+        self,
+        setup: np.ndarray,
+        capacity: np.ndarray,
+        facility_xy: np.ndarray,
+        demand: np.ndarray,
+        customer_xy: np.ndarray
+    ):
+        """Facilities and customers of a facility location instance
+
+        Parameters
+        ----------
+        setup : np.ndarray
+            Setup cost of every facility
+
+        capacity : np.ndarray
+            Capacity of every facility
+
+        facility_xy : np.ndarray
+            Array of shape (|N|, 2) with the location of the facilities
+
+        demand : np.ndarray
+            Demand of every customer
+
+        customer_xy : np.ndarray
+            Array of shape (|M|, 2) with the location of the customers
+        """
+        self.setup = setup
+        self.capacity = capacity
+        self.facility_xy = facility_xy
+        self.demand = demand
+        self.customer_xy = customer_xy
+        self._distances = None
+
+    def __repr__(self) -> str:
+        return f"FacilityInstance(facilities={self.facility_count}, customers={self.customer_count})"
+
+    @classmethod
+    def from_instance(cls, input_data: Text, cache_dir: Optional[str] = None) -> 'FacilityInstance':
+        """Builds the instance of a fl_* file through the on-disk cache
+
+        Parameters
+        ----------
+        input_data : Text
+            Contents of the instance file
+
+        cache_dir : Optional[str], optional
+            Directory of the cache, by default `common.cache.CACHE_DIR`
+
+        Returns
+        -------
+        FacilityInstance
+            Instance with read-only arrays when they come from the cache
+        """
+        arrays = cached_arrays(input_data, "facility", build_facility_arrays, cache_dir)
+        return cls(
+            arrays["setup"], arrays["capacity"], arrays["facility_xy"], arrays["demand"], arrays["customer_xy"]
+        )
+
+    @property
+    def facility_count(self) -> int:
+        return len(self.setup)
+
+    @property
+    def customer_count(self) -> int:
+        return len(self.demand)
+
+    @property
+    def distances(self) -> np.ndarray:
+        # Computed on first use, the local search and the MIP share it
+        if self._distances is None:
+            self._distances = distance_matrix(self.facility_xy, self.customer_xy)
+        return self._distances
+
+    def cost(self, assignment: np.ndarray) -> float:
+        """Setup cost of the facilities used plus the distance of every customer to its facility"""
+        assignment = np.asarray(assignment)
+        used = np.zeros(self.facility_count, dtype=bool)
+        used[assignment] = True
+        customers = np.arange(self.customer_count)
+        return float(self.setup[used].sum() + self.distances[assignment, customers].sum())
+
+    def is_feasible(self, assignment: np.ndarray) -> bool:
+        """Either or not no facility serves more demand than its capacity"""
+        load = np.bincount(np.asarray(assignment), weights=self.demand, minlength=self.facility_count)
+        return bool(np.all(load <= self.capacity + 1e-9))
+
+
+def distance_matrix(
+    facility_xy: np.ndarray,
+    customer_xy: np.ndarray,
+    chunk_cells: int = distance_chunk_cells
+) -> np.ndarray:
+    """Euclidean distance between every facility and every customer
+
+    The matrix comes from one broadcast, done in blocks of customers when there are
+    more than `chunk_cells` pairs so the temporary arrays stay small.
+
+    Parameters
+    ----------
+    facility_xy : np.ndarray
+        Array of shape (|N|, 2) with the location of the facilities
+
+    customer_xy : np.ndarray
+        Array of shape (|M|, 2) with the location of the customers
+
+    chunk_cells : int, optional
+        Largest number of pairs of a block, by default 2**24
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (|N|, |M|)
+    """
+    facility_xy = np.asarray(facility_xy, dtype=np.float64)
+    customer_xy = np.asarray(customer_xy, dtype=np.float64)
+    facility_count, customer_count = len(facility_xy), len(customer_xy)
+
+    distances = np.empty((facility_count, customer_count))
+    block = max(chunk_cells // max(facility_count, 1), 1)
+    for start in range(0, customer_count, block):
+        stop = min(start + block, customer_count)
+        np.hypot(
+            facility_xy[:, 0, None] - customer_xy[None, start:stop, 0],
+            facility_xy[:, 1, None] - customer_xy[None, start:stop, 1],
+            out=distances[:, start:stop]
+        )
+    return distances
+
+def build_facility_arrays(input_data: Text) -> Dict[str, np.ndarray]:
+    """Parses a fl_* instance into the arrays stored in the cache"""
+    setup, capacity, facility_xy, demand, customer_xy = parse_facility(input_data)
+    return {
+        "setup": setup,
+        "capacity": capacity,
+        "facility_xy": facility_xy,
+        "demand": demand,
+        "customer_xy": customer_xy,
+    }
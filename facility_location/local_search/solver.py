@@ -0,0 +1,269 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from common.loader import read_instance
+from facility_location.instance import FacilityInstance
+
+# Seconds after which the local search returns the best assignment found
+time_limit = 60.0
+# Smallest decrease of the cost for a move to be an improvement
+improvement_tolerance = 1e-9
+
+class FacilityLocalSearch:
+
+    instance: FacilityInstance
+    assignment: np.ndarray
+    load: np.ndarray
+    count: np.ndarray
+
+    def __init__(self, instance, seed=None, time_limit=time_limit):
+        """Greedy assignment of the customers improved by reassign, swap and close moves
+
+        Every move keeps the assignment within the capacity of the facilities and is
+        only applied when it lowers the total cost. The cost of a move for every
+        customer, or pair of customers, comes from one NumPy expression over the
+        distance matrix.
+
+        Parameters
+        ----------
+        instance : FacilityInstance
+            Instance to solve
+
+        seed : int, optional
+            Seed of the order in which swaps are tried, by default None
+
+        time_limit : float, optional
+            Seconds after which `solve` returns the best assignment found, by default 60.0
+        """
+        self.instance = instance
+        self.distances = instance.distances
+        self.setup = np.asarray(instance.setup, dtype=np.float64)
+        self.capacity = np.asarray(instance.capacity, dtype=np.float64)
+        self.demand = np.asarray(instance.demand, dtype=np.float64)
+        self.customers = np.arange(instance.customer_count)
+        self.rng = Random(seed)
+        self.time_limit = time_limit
+        self.deadline = None
+
+        # Facility of every customer, demand served by every facility and number of customers of every facility
+        self.assignment = np.zeros(instance.customer_count, dtype=np.int64)
+        self.load = np.zeros(instance.facility_count)
+        self.count = np.zeros(instance.facility_count, dtype=np.int64)
+
+    def timed_out(self):
+        return self.deadline is not None and perf_counter() >= self.deadline
+
+    def assign(self, assignment):
+        """Takes an assignment as the current one and recomputes the load of the facilities"""
+        self.assignment = np.asarray(assignment, dtype=np.int64).copy()
+        self.load = np.bincount(self.assignment, weights=self.demand, minlength=self.instance.facility_count)
+        self.count = np.bincount(self.assignment, minlength=self.instance.facility_count)
+
+    def move(self, customer, facility):
+        old_facility = self.assignment[customer]
+        self.load[old_facility] -= self.demand[customer]
+        self.count[old_facility] -= 1
+        self.load[facility] += self.demand[customer]
+        self.count[facility] += 1
+        self.assignment[customer] = facility
+
+    def initial_assignment(self):
+        """Assigns the customers by decreasing demand to the facility of lowest cost with enough capacity left
+
+        A closed facility costs its distance plus the share of its setup cost that the
+        demand of the customer takes from its capacity.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            setup_rate = np.where(self.capacity > 0, self.setup / self.capacity, np.inf)
+        remaining = self.capacity.copy()
+        opened = np.zeros(self.instance.facility_count, dtype=bool)
+        assignment = np.zeros(self.instance.customer_count, dtype=np.int64)
+
+        for customer in np.argsort(-self.demand, kind="stable").tolist():
+            demand = self.demand[customer]
+            score = self.distances[:, customer] + np.where(opened, 0.0, setup_rate * demand)
+            score[remaining < demand] = np.inf
+            facility = int(np.argmin(score))
+            if not np.isfinite(score[facility]):
+                raise ValueError(f"No facility has enough capacity left for customer {customer}")
+            assignment[customer] = facility
+            remaining[facility] -= demand
+            opened[facility] = True
+
+        self.assign(assignment)
+
+    def reassign_pass(self):
+        """Moves customers to another facility, opening it if needed, best moves first
+
+        Returns
+        -------
+        bool
+            Either or not some customer moved
+        """
+        assignment = self.assignment
+        current = self.distances[assignment, self.customers]
+        # A customer alone in its facility also saves its setup cost, a closed facility adds its own
+        saved = current + np.where(self.count[assignment] == 1, self.setup[assignment], 0.0)
+        delta = self.distances + np.where(self.count == 0, self.setup, 0.0)[:, None] - saved[None, :]
+        delta[(self.capacity - self.load)[:, None] < self.demand[None, :]] = np.inf
+        delta[assignment, self.customers] = np.inf
+
+        targets = np.argmin(delta, axis=0)
+        best = delta[targets, self.customers]
+        candidates = np.flatnonzero(best < -improvement_tolerance)
+
+        improved = False
+        for customer in candidates[np.argsort(best[candidates], kind="stable")].tolist():
+            # Earlier moves of the pass may have changed the capacity left or the open facilities
+            facility = int(targets[customer])
+            old_facility = int(assignment[customer])
+            if self.capacity[facility] - self.load[facility] < self.demand[customer]:
+                continue
+            change = self.distances[facility, customer] - self.distances[old_facility, customer]
+            change += self.setup[facility] if self.count[facility] == 0 else 0.0
+            change -= self.setup[old_facility] if self.count[old_facility] == 1 else 0.0
+            if change < -improvement_tolerance:
+                self.move(customer, facility)
+                improved = True
+
+        return improved
+
+    def swap_pass(self):
+        """Exchanges the facilities of pairs of customers, in random order of the first customer
+
+        Returns
+        -------
+        bool
+            Either or not some pair of customers was exchanged
+        """
+        assignment = self.assignment
+        distances = self.distances
+        current = distances[assignment, self.customers]
+        order = self.rng.sample(range(self.instance.customer_count), self.instance.customer_count)
+
+        improved = False
+        for step, customer in enumerate(order):
+            if step % 64 == 0 and self.timed_out():
+                break
+
+            facility = assignment[customer]
+            demand = self.demand[customer]
+            # Cost change of exchanging the customer with every other one
+            delta = distances[assignment, customer] + distances[facility] - current[customer] - current
+            feasible = self.load[facility] - demand + self.demand <= self.capacity[facility]
+            feasible &= self.load[assignment] - self.demand + demand <= self.capacity[assignment]
+            feasible &= assignment != facility
+            delta[~feasible] = np.inf
+
+            other = int(np.argmin(delta))
+            if delta[other] < -improvement_tolerance:
+                other_facility = assignment[other]
+                self.load[facility] += self.demand[other] - demand
+                self.load[other_facility] += demand - self.demand[other]
+                assignment[customer], assignment[other] = other_facility, facility
+                current[customer] = distances[other_facility, customer]
+                current[other] = distances[facility, other]
+                improved = True
+
+        return improved
+
+    def close_pass(self):
+        """Closes facilities whose customers fit in the other open facilities at a lower total cost
+
+        The customers of the facility go by decreasing demand to the nearest open
+        facility with enough capacity left.
+
+        Returns
+        -------
+        bool
+            Either or not some facility was closed
+        """
+        improved = False
+        for facility in np.argsort(-self.setup / np.maximum(self.count, 1)).tolist():
+            if self.count[facility] == 0 or self.timed_out():
+                continue
+
+            members = np.flatnonzero(self.assignment == facility)
+            members = members[np.argsort(-self.demand[members], kind="stable")]
+            remaining = np.where(self.count > 0, self.capacity - self.load, -np.inf)
+            remaining[facility] = -np.inf
+
+            change = -self.setup[facility]
+            targets = []
+            for customer in members.tolist():
+                score = np.where(remaining >= self.demand[customer], self.distances[:, customer], np.inf)
+                target = int(np.argmin(score))
+                if not np.isfinite(score[target]):
+                    break
+                remaining[target] -= self.demand[customer]
+                change += score[target] - self.distances[facility, customer]
+                targets.append(target)
+
+            if len(targets) == len(members) and change < -improvement_tolerance:
+                for customer, target in zip(members.tolist(), targets):
+                    self.move(customer, target)
+                improved = True
+
+        return improved
+
+    def solve(self, assignment=None):
+        """Improves an assignment until no move lowers its cost or the time is over
+
+        Parameters
+        ----------
+        assignment : np.ndarray, optional
+            Capacity-feasible initial assignment, by default the greedy one
+
+        Returns
+        -------
+        Tuple[np.ndarray, float]
+            Facility of every customer and total cost
+        """
+        if self.time_limit is not None:
+            self.deadline = perf_counter() + self.time_limit
+
+        if assignment is None:
+            self.initial_assignment()
+        else:
+            self.assign(assignment)
+
+        improved = True
+        while improved and not self.timed_out():
+            # Every kind of move runs at each round, even after an improvement
+            improved = self.reassign_pass()
+            improved |= self.close_pass()
+            improved |= self.swap_pass()
+
+        return self.assignment.copy(), self.instance.cost(self.assignment)
+
+def solve_it(input_data, time_limit=time_limit, seed=None):
+    # parse the input
+    instance = FacilityInstance.from_instance(input_data)
+
+    local_search = FacilityLocalSearch(instance, seed=seed, time_limit=time_limit)
+    assignment, cost = local_search.solve()
+
+    # prepare the solution in the specified output format
+    output_data = '%.3f' % cost + ' ' + str(0) + '\n'
+    output_data += ' '.join(map(str, assignment.tolist()))
+
+    return output_data
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        input_data = read_instance(file_location)
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python local_search/solver.py ./data/fl_3_1)')
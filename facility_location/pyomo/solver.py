@@ -0,0 +1,277 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from typing import Optional, Tuple
+
+import numpy as np
+import pyomo.environ as pyo
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from common.loader import read_instance
+from facility_location.instance import FacilityInstance
+from facility_location.local_search.solver import FacilityLocalSearch
+
+# Nearest facilities of every customer in the first model
+nearest_count = 10
+# Rounds of the LP relaxation adding the arcs of negative reduced cost
+pricing_rounds = 20
+# Times the priced model may grow to take every arc that could still beat the warm start
+arc_growth = 4
+# Seconds given to the local search of the warm start and to HiGHS on the MIP
+local_search_time_limit = 30.0
+mip_time_limit = 60.0
+# Reduced cost below which an arc is missing from the LP relaxation
+pricing_tolerance = 1e-6
+
+# Every customer is served by exactly one facility
+def assign_cstr(model, c):
+    return sum(model.x[f, c] for f in model.facilities_of[c]) == 1
+
+# The demand served by a facility fits in its capacity, and only an open facility serves some
+def capacity_cstr(model, f):
+    if not model.customers_of[f]:
+        return pyo.Constraint.Skip
+    return sum(model.demand[c] * model.x[f, c] for c in model.customers_of[f]) <= model.capacity[f] * model.y[f]
+
+# A customer is only served by an open facility, which tightens the relaxation
+def link_cstr(model, f, c):
+    return model.x[f, c] <= model.y[f]
+
+# Setup cost of the open facilities plus distance of every customer to its facility
+def obj(model):
+    return (
+        sum(model.setup[f] * model.y[f] for f in model.F)
+        + sum(model.distance[f, c] * model.x[f, c] for f, c in model.A)
+    )
+
+def build_mip(instance: FacilityInstance, arcs: np.ndarray, relax: bool = False) -> pyo.ConcreteModel:
+    """Instantiates pyomo Mixed Integer Programming model for the Facility Location Problem
+
+    Only the facility-customer arcs of `arcs` get an assignment variable, so the
+    model grows with the number of arcs and not with |N| x |M|.
+
+    Parameters
+    ----------
+    instance : FacilityInstance
+        Instance to solve
+
+    arcs : np.ndarray
+        Boolean array of shape (|N|, |M|) with the arcs of the model
+
+    relax : bool, optional
+        Either or not to relax the integrality of the variables, by default False
+
+    Returns
+    -------
+    pyo.ConcreteModel
+        `Concretemodel` of pyomo
+    """
+    facilities, customers = np.nonzero(arcs)
+    arc_list = list(zip(facilities.tolist(), customers.tolist()))
+    domain = pyo.UnitInterval if relax else pyo.Binary
+
+    # Create instance
+    model = pyo.ConcreteModel()
+
+    # Create sets
+    model.F = pyo.Set(initialize=range(instance.facility_count))  # Facilities
+    model.C = pyo.Set(initialize=range(instance.customer_count))  # Customers
+    model.A = pyo.Set(initialize=arc_list, dimen=2)  # Arcs
+
+    # Data of the rules
+    model.setup = instance.setup.tolist()
+    model.capacity = instance.capacity.tolist()
+    model.demand = instance.demand.tolist()
+    model.distance = dict(zip(arc_list, instance.distances[facilities, customers].tolist()))
+    model.facilities_of = [[] for _ in range(instance.customer_count)]
+    model.customers_of = [[] for _ in range(instance.facility_count)]
+    for f, c in arc_list:
+        model.facilities_of[c].append(f)
+        model.customers_of[f].append(c)
+
+    # Create variables
+    model.x = pyo.Var(model.A, within=domain)
+    model.y = pyo.Var(model.F, within=domain)
+
+    # Create constraints
+    model.assign_cstr = pyo.Constraint(model.C, rule=assign_cstr)
+    model.capacity_cstr = pyo.Constraint(model.F, rule=capacity_cstr)
+    model.link_cstr = pyo.Constraint(model.A, rule=link_cstr)
+
+    # Create objective
+    model.obj = pyo.Objective(rule=obj)
+
+    return model
+
+def nearest_facilities(instance: FacilityInstance, k: int) -> np.ndarray:
+    """Array of shape (|M|, k) with the k nearest facilities of every customer, found with a KD-tree"""
+    k = min(k, instance.facility_count)
+    if cKDTree is not None:
+        _, nearest = cKDTree(instance.facility_xy).query(instance.customer_xy, k=k)
+        return np.asarray(nearest).reshape(instance.customer_count, k)
+    # Without scipy the columns of the distance matrix give the same facilities
+    return np.argpartition(instance.distances, k - 1, axis=0)[:k].T
+
+def reduced_costs(instance: FacilityInstance, model: pyo.ConcreteModel) -> np.ndarray:
+    """Reduced cost of every arc from the duals of the solved relaxation, as if it had no link constraint
+
+    Parameters
+    ----------
+    instance : FacilityInstance
+        Instance of the model
+
+    model : pyo.ConcreteModel
+        Relaxation solved with a `dual` suffix
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (|N|, |M|), d[f, c] - u[c] - demand[c] * v[f] with u and v the duals
+        of the assignment and capacity constraints
+    """
+    assign_dual = np.array([model.dual[model.assign_cstr[c]] for c in model.C])
+    capacity_dual = np.array([
+        model.dual[model.capacity_cstr[f]] if f in model.capacity_cstr else 0.0 for f in model.F
+    ])
+    demand = np.asarray(instance.demand, dtype=np.float64)
+    return instance.distances - assign_dual[None, :] - demand[None, :] * capacity_dual[:, None]
+
+def warmstart_from_assignment(model, instance, assignment):
+    """Loads an assignment as the values of the model"""
+    used = np.zeros(instance.facility_count)
+    used[assignment] = 1.0
+    chosen = set(zip(assignment.tolist(), range(instance.customer_count)))
+    model.x.set_values({arc: float(arc in chosen) for arc in model.A})
+    model.y.set_values(dict(zip(range(instance.facility_count), used.tolist())))
+
+def solve_mip(
+    instance: FacilityInstance,
+    assignment: np.ndarray,
+    k: int = nearest_count,
+    time_limit: Optional[float] = mip_time_limit
+) -> Tuple[np.ndarray, float, float]:
+    """Solves the sparse MIP over the k nearest facilities of every customer
+
+    The relaxation is solved and the arcs of negative reduced cost added back until
+    there are none left, which makes its value a lower bound of the whole instance.
+    Any solution using a missing arc then costs at least that bound plus the reduced
+    cost of the arc, so the arcs whose reduced cost is below the gap of the warm start
+    are added too. When they grow the model at most `arc_growth` times, the bound of
+    the MIP holds for the whole instance, otherwise only the bound of the relaxation does.
+
+    Parameters
+    ----------
+    instance : FacilityInstance
+        Instance to solve
+
+    assignment : np.ndarray
+        Capacity-feasible assignment, whose arcs are always in the model and which is the warm start
+
+    k : int, optional
+        Nearest facilities of every customer in the first model, by default 10
+
+    time_limit : Optional[float], optional
+        Seconds given to HiGHS on the MIP, by default 60.0
+
+    Returns
+    -------
+    Tuple[np.ndarray, float, float]
+        Facility of every customer, its cost and a lower bound on the optimal cost
+    """
+    assignment = np.asarray(assignment, dtype=np.int64)
+    customers = np.arange(instance.customer_count)
+    arcs = np.zeros((instance.facility_count, instance.customer_count), dtype=bool)
+    arcs[nearest_facilities(instance, k), customers[:, None]] = True
+    arcs[assignment, customers] = True
+
+    opt = pyo.SolverFactory("appsi_highs")
+
+    # Pricing: the relaxation takes the arcs of negative reduced cost until it is optimal over every arc
+    complete = False
+    for _ in range(pricing_rounds):
+        relaxation = build_mip(instance, arcs, relax=True)
+        relaxation.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+        opt.solve(relaxation)
+        costs = reduced_costs(instance, relaxation)
+        missing = (costs < -pricing_tolerance) & ~arcs
+        if not missing.any():
+            complete = True
+            break
+        arcs |= missing
+    lower_bound = pyo.value(relaxation.obj) if complete else 0.0
+
+    # Reduced cost fixing: only the missing arcs below the gap may lead to a cheaper solution
+    upper_bound = instance.cost(assignment)
+    if complete:
+        needed = (costs < upper_bound - lower_bound) & ~arcs
+        if np.count_nonzero(needed) <= (arc_growth - 1) * np.count_nonzero(arcs):
+            arcs |= needed
+        else:
+            complete = False
+
+    model = build_mip(instance, arcs)
+    warmstart_from_assignment(model, instance, assignment)
+    # The model starts from the assignment given, so HiGHS begins with its bound
+    res = opt.solve(model, warmstart=True, timelimit=time_limit)
+
+    solution = assignment.copy()
+    for (f, c), x in model.x.items():
+        if x.value is not None and round(x.value) == 1:
+            solution[c] = f
+    cost = instance.cost(solution)
+    if cost > upper_bound or not instance.is_feasible(solution):
+        solution, cost = assignment, upper_bound
+
+    # The bound of the MIP only covers the whole instance when no useful arc is missing
+    mip_bound = res.problem.lower_bound
+    if complete and mip_bound is not None and np.isfinite(mip_bound):
+        lower_bound = max(lower_bound, mip_bound)
+    return solution, cost, lower_bound
+
+# k nearest facilities of every customer start the model, local_search_time_limit and mip_time_limit are
+# the seconds given to the warm start and to HiGHS
+def solve_it(
+    input_data,
+    k = nearest_count,
+    local_search_time_limit = local_search_time_limit,
+    mip_time_limit = mip_time_limit,
+    seed = None
+):
+    # parse the input
+    instance = FacilityInstance.from_instance(input_data)
+
+    # Warm start from the local search
+    local_search = FacilityLocalSearch(instance, seed=seed, time_limit=local_search_time_limit)
+    assignment, _ = local_search.solve()
+
+    solution, cost, lower_bound = solve_mip(instance, assignment, k, mip_time_limit)
+
+    # The solution is optimal when its cost meets the lower bound, up to the precision of HiGHS
+    gap = (cost - lower_bound) / max(abs(cost), 1e-9)
+    optimal = int(gap <= 1e-6)
+    if not optimal:
+        print(f"Cost {cost:.3f}, lower bound {lower_bound:.3f}, gap {gap:.2%}", file=sys.stderr)
+
+    # prepare the solution in the specified output format
+    output_data = '%.3f' % cost + ' ' + str(optimal) + '\n'
+    output_data += ' '.join(map(str, solution.tolist()))
+
+    return output_data
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        input_data = read_instance(file_location)
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python pyomo/solver.py ./data/fl_3_1)')
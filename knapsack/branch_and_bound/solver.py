@@ -1,113 +1,290 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import os
+import sys
+from bisect import bisect_right
 from collections import namedtuple
+from heapq import heappop, heappush
+from time import perf_counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from common.loader import read_instance
+from knapsack.instance import KnapsackInstance
+from knapsack.preprocessing import KnapsackReduction
+
 Item = namedtuple("Item", ['index', 'value', 'weight'])
 
-def get_expectation(items, capacity, start):
-
-    expectation = 0.0
-    for i in range(start, len(items)):
-        item = items[i]
-        
-        if capacity >= item.weight:
-            expectation += item.value
-            capacity -= item.weight
-        
-        # If current capacity is not enough to carry the whole item, then put a fraction of it into the knapsack
-        # and add the same fraction of its value to the expectation
-        else:
-            expectation += item.value * capacity / item.weight
-            break
+# Open nodes of the best-first search above which it goes on depth first, to bound its memory
+open_node_limit = 200000
+# Nodes between two checks of the time limit and of the progress
+time_check_interval = 1024
+# Seconds between two calls of the progress callback
+progress_interval = 1.0
+
+# Prefix sums of the weights and values of the sorted items, prefix[i] being the sum of items 0 to i - 1
+def get_prefix_sums(items):
+
+    prefix_weights = [0]
+    prefix_values = [0]
+    for item in items:
+        prefix_weights.append(prefix_weights[-1] + item.weight)
+        prefix_values.append(prefix_values[-1] + item.value)
+
+    return prefix_weights, prefix_values
+
+# Fractional (Dantzig) bound of the items from start on with the left capacity, in O(log n)
+# The items taken whole are a prefix of the ratio order, found by binary search on the prefix weights
+# and the critical item that does not fit adds the fraction of its value that fills the capacity
+def get_expectation(items, prefix_weights, prefix_values, capacity, start):
+
+    critical = bisect_right(prefix_weights, prefix_weights[start] + capacity, start) - 1
+    expectation = prefix_values[critical] - prefix_values[start]
+
+    if critical < len(items):
+        item = items[critical]
+        capacity -= prefix_weights[critical] - prefix_weights[start]
+        expectation += item.value * capacity / item.weight
 
     return expectation
 
-def search(items, capacity):
-    
+# Calls the progress callback of a search with its statistics
+def report_progress(progress, start, node_count, max_value, bound):
+
+    elapsed = perf_counter() - start
+    progress({
+        "time": elapsed,
+        "nodes": node_count,
+        "nodes_per_second": node_count / elapsed if elapsed > 0 else 0.0,
+        "value": max_value,
+        "bound": bound,
+    })
+
+# Depth-first search, stops after node_limit nodes or time_limit seconds
+# Returns the best value, its item-take choices and an upper bound on the optimum, which is the best value
+# when the tree was fully explored
+# progress, if given, receives the statistics of the search every progress_interval seconds
+def search(items, capacity, node_limit=None, time_limit=None, progress=None):
+
     list_size = len(items)
     max_value = 0.0
     max_taken = [0]*list_size
 
+    prefix_weights, prefix_values = get_prefix_sums(items)
+
     # To prevent from stack-overflow, instead of using plain recursion here I maintain the stack myself
-    # a stack element includes 5 parts:
+    # a stack element is a tuple of 5 parts, with no copy of the take/no-take choices:
     # value:         value accumulated so far
     # capacity:      left capacity
     # expectation:   upper bound of value that can get with the left capacity
-    # taken:         current take/no-take choice of each item
     # pos:           next item to consider
+    # take:          either or not the item at pos - 1 was taken
+    #
+    # The choices of the current node are the positions of the items taken on its path, kept in the
+    # path undo stack. The search is depth first, so the positions of the path always increase and
+    # popping a node only has to drop the positions decided after its parent.
 
-    start_value = 0.0
-    start_capacity = capacity
-    start_expectation = get_expectation(items, capacity, 0)
-    start_taken = [0]*list_size
-    start_pos = 0
+    start_expectation = get_expectation(items, prefix_weights, prefix_values, capacity, 0)
 
-    StackElem = namedtuple("StackElem", ['value', 'capacity', 'expectation', 'taken', 'pos'])
-    stack = []
-    stack.append(StackElem(start_value, start_capacity, start_expectation, start_taken, start_pos))
+    stack = [(0.0, capacity, start_expectation, 0, False)]
+    path = []
+
+    start = last_progress = perf_counter()
+    node_count = 0
 
     while stack:
-        Current = stack.pop()
+        if node_limit is not None and node_count >= node_limit:
+            break
+        if node_count % time_check_interval == 0 and (time_limit is not None or progress is not None):
+            now = perf_counter()
+            if progress is not None and now - last_progress >= progress_interval:
+                last_progress = now
+                report_progress(progress, start, node_count, max_value, max(node[2] for node in stack))
+            if time_limit is not None and now - start >= time_limit:
+                break
+
+        value, left_capacity, expectation, pos, take = stack.pop()
+        node_count += 1
 
-        # If left capacity is not enough, then backtrack
-        if Current.capacity < 0:
-            continue
-        
         # If current expectation is smaller than the best value, then backtrack
-        if Current.expectation <= max_value:
+        if expectation <= max_value:
             continue
 
+        # Undo the choices made below the parent of this node, then apply its own
+        while path and path[-1] >= pos - 1:
+            path.pop()
+        if take:
+            path.append(pos - 1)
+
         # If next item to consider does not exist, then backtrack
-        if Current.pos >= list_size:
-            # If max value is smaller than current value, update max value and its item-take choices
-            if max_value < Current.value:
-                max_value = Current.value
-                max_taken = Current.taken
+        if pos >= list_size:
+            # If max value is smaller than current value, update max value and rebuild its item-take choices
+            if max_value < value:
+                max_value = value
+                max_taken = [0]*list_size
+                for taken_pos in path:
+                    max_taken[items[taken_pos].index] = 1
+
+            continue
+
+        CurrentItem = items[pos]
+
+        # Try not to take the next item
+        notake_expectation = value + get_expectation(items, prefix_weights, prefix_values, left_capacity, pos + 1)
+        stack.append((value, left_capacity, notake_expectation, pos + 1, False))
+
+        # Try to take the next item, if left capacity is enough
+        take_capacity = left_capacity - CurrentItem.weight
+        if take_capacity >= 0:
+            take_value = value + CurrentItem.value
+            take_expectation = take_value + get_expectation(items, prefix_weights, prefix_values, take_capacity, pos + 1)
+            stack.append((take_value, take_capacity, take_expectation, pos + 1, True))
+
+    # The nodes left bound the value of the solutions not explored
+    bound = max([max_value] + [node[2] for node in stack])
+    if progress is not None:
+        report_progress(progress, start, node_count, max_value, bound)
+
+    return max_value, max_taken, bound
+
+# Branch and bound of the core problem of a reduction, the items come in ratio order
+# Best-first search, the open node with the highest expectation is explored first
+# Stops and reports its progress like search, and returns the same values
+def search_best_first(items, capacity, node_limit=None, time_limit=None, progress=None, memory_limit=open_node_limit):
+
+    list_size = len(items)
+    max_value = 0.0
+    max_path = 0
+
+    prefix_weights, prefix_values = get_prefix_sums(items)
+    start = perf_counter()
+
+    # A node is a tuple of 5 parts:
+    # -expectation:  opposite of the upper bound of value, the key of the heap
+    # value:         value accumulated so far
+    # capacity:      left capacity
+    # pos:           next item to consider
+    # path:          bitset of the positions of the items taken
+    #
+    # When there are more than memory_limit open nodes, the heap becomes the stack of a depth-first search
+    start_expectation = get_expectation(items, prefix_weights, prefix_values, capacity, 0)
+    open_nodes = [(-start_expectation, 0.0, capacity, 0, 0)]
+    best_first = True
+    node_count = 0
+    last_progress = start
 
+    while open_nodes:
+        if node_limit is not None and node_count >= node_limit:
+            break
+        if node_count % time_check_interval == 0 and (time_limit is not None or progress is not None):
+            now = perf_counter()
+            if progress is not None and now - last_progress >= progress_interval:
+                last_progress = now
+                bound = -open_nodes[0][0] if best_first else -min(node[0] for node in open_nodes)
+                report_progress(progress, start, node_count, max_value, max(max_value, bound))
+            if time_limit is not None and now - start >= time_limit:
+                break
+
+        node_count += 1
+        if best_first:
+            neg_expectation, value, left_capacity, pos, path = heappop(open_nodes)
+            # Every other open node has a lower expectation, the search is over
+            if -neg_expectation <= max_value:
+                open_nodes.clear()
+                break
+        else:
+            neg_expectation, value, left_capacity, pos, path = open_nodes.pop()
+            if -neg_expectation <= max_value:
+                continue
+
+        # Leaving out the items not considered yet gives a solution
+        if max_value < value:
+            max_value = value
+            max_path = path
+
+        if pos >= list_size:
             continue
 
-        CurrentItem = items[Current.pos]
+        CurrentItem = items[pos]
+        push = heappush if best_first else list.append
 
         # Try not to take the next item
-        notake_value = Current.value
-        notake_capacity = Current.capacity
-        notake_expectation = notake_value + get_expectation(items, notake_capacity, Current.pos + 1)
-        notake_taken = Current.taken.copy()
+        notake_expectation = value + get_expectation(items, prefix_weights, prefix_values, left_capacity, pos + 1)
+        if notake_expectation > max_value:
+            push(open_nodes, (-notake_expectation, value, left_capacity, pos + 1, path))
+
+        # Try to take the next item, if left capacity is enough
+        take_capacity = left_capacity - CurrentItem.weight
+        if take_capacity >= 0:
+            take_value = value + CurrentItem.value
+            take_expectation = take_value + get_expectation(items, prefix_weights, prefix_values, take_capacity, pos + 1)
+            push(open_nodes, (-take_expectation, take_value, take_capacity, pos + 1, path | 1 << pos))
 
-        stack.append(StackElem(notake_value, notake_capacity, notake_expectation, notake_taken, Current.pos + 1))
+        if best_first and len(open_nodes) > memory_limit:
+            best_first = False
 
-        # Try to take the next item
-        take_value = Current.value + CurrentItem.value
-        take_capacity = Current.capacity - CurrentItem.weight
-        take_expectation = take_value + get_expectation(items, take_capacity, Current.pos + 1)
-        take_taken = Current.taken.copy()
-        take_taken[CurrentItem.index] = 1
+    # The open nodes left bound the value of the solutions not explored
+    bound = max([max_value] + [-node[0] for node in open_nodes])
+    if progress is not None:
+        report_progress(progress, start, node_count, max_value, bound)
 
-        stack.append(StackElem(take_value, take_capacity, take_expectation, take_taken, Current.pos + 1))
+    max_taken = [0]*list_size
+    for pos in range(list_size):
+        if max_path >> pos & 1:
+            max_taken[items[pos].index] = 1
+
+    return max_value, max_taken, bound
+
+# Branch and bound of a problem whose items come in ratio order, returns its value, item-take choices
+# and upper bound
+def solve_core(values, weights, capacity, strategy="depth_first", node_limit=None, time_limit=None, progress=None):
 
-    return max_value, max_taken
+    items = [Item(i, value, weight) for i, (value, weight) in enumerate(zip(values.tolist(), weights.tolist()))]
+    if strategy == "best_first":
+        return search_best_first(items, capacity, node_limit, time_limit, progress)
+    return search(items, capacity, node_limit, time_limit, progress)
 
-def solve_it(input_data):
+# preprocess reduces the instance to a core problem around the break item before branching
+# strategy is "depth_first" or "best_first"
+# The search stops after node_limit nodes or time_limit seconds and keeps the best solution found, opt is 1
+# only when the whole tree was explored. progress receives the statistics of the search every second
+def solve_it(input_data, preprocess=True, strategy="depth_first", node_limit=None, time_limit=None, progress=None):
     # parse the input
-    lines = input_data.split('\n')
+    instance = KnapsackInstance.from_instance(input_data)
+    deadline = None if time_limit is None else perf_counter() + time_limit
 
-    firstLine = lines[0].split()
-    item_count = int(firstLine[0])
-    capacity = int(firstLine[1])
+    reduction = KnapsackReduction(instance) if preprocess else None
 
-    items = []
+    # The values of a core problem leave out the items the reduction fixed
+    def core_progress(statistics):
+        if reduction is not None:
+            statistics["value"] += reduction.fixed_value
+            statistics["bound"] += reduction.fixed_value
+        progress(statistics)
+
+    # Every core problem gets the time left
+    def solve(values, weights, capacity):
+        time_left = None if deadline is None else max(deadline - perf_counter(), 0.0)
+        return solve_core(values, weights, capacity, strategy, node_limit, time_left, None if progress is None else core_progress)
+
+    if preprocess:
+        value, taken, bound = reduction.solve(solve)
+    else:
+        value, taken, bound = solve(instance.values[instance.order], instance.weights[instance.order], instance.capacity)
+        taken = [taken[i] for i in np.argsort(instance.order).tolist()]
 
-    for i in range(1, item_count+1):
-        line = lines[i]
-        parts = line.split()
-        items.append(Item(i-1, int(parts[0]), int(parts[1])))
+    # The values are integers, so are the best value and the optimum
+    value = int(round(value))
+    bound = int(np.floor(bound + 1e-9))
+    optimal = int(bound <= value)
+    if not optimal:
+        print(f"Search stopped by its limits: value {value}, bound {bound}, gap {(bound - value) / bound:.2%}", file=sys.stderr)
 
-    sorted_items = sorted(items, key=lambda x: getattr(x, 'value')/getattr(x, 'weight'), reverse=True)
-    
-    value, taken = search(sorted_items, capacity)
-    
     # prepare the solution in the specified output format
-    output_data = str(value) + ' ' + str(0) + '\n'
+    output_data = str(value) + ' ' + str(optimal) + '\n'
     output_data += ' '.join(map(str, taken))
     return output_data
 
@@ -116,8 +293,7 @@ if __name__ == '__main__':
     import sys
     if len(sys.argv) > 1:
         file_location = sys.argv[1].strip()
-        with open(file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
+        input_data = read_instance(file_location)
         print(solve_it(input_data))
     else:
         print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/ks_4_0)')
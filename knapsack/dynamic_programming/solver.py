@@ -0,0 +1,173 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from common.loader import read_instance
+from knapsack.branch_and_bound import solver as branch_and_bound
+from knapsack.instance import KnapsackInstance
+
+# Largest table, in items times capacity cells, solved by dynamic programming with the "auto" backend
+dp_cell_limit = 10**9
+# Largest bit-packed decision table in bytes, bigger tables are split in halves (Hirschberg)
+dp_memory_limit = 256 * 2**20
+
+def dp_profile(values: np.ndarray, weights: np.ndarray, capacity: int) -> np.ndarray:
+    """Best value of the items for every capacity, one vectorized row update per item
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Value of every item
+
+    weights : np.ndarray
+        Weight of every item
+
+    capacity : int
+        Capacity of the knapsack
+
+    Returns
+    -------
+    np.ndarray
+        Array of capacity + 1 values, the c-th being the best value with weight at most c
+    """
+    best = np.zeros(capacity + 1, dtype=np.int64)
+    for value, weight in zip(values.tolist(), weights.tolist()):
+        if weight <= capacity:
+            # Taking the item moves the profile right by its weight and up by its value
+            np.maximum(best[weight:], best[:capacity + 1 - weight] + value, out=best[weight:])
+    return best
+
+def dp_table(values: np.ndarray, weights: np.ndarray, capacity: int) -> Tuple[int, np.ndarray]:
+    """Solves the knapsack keeping one bit-packed row of take decisions per item
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Value of every item
+
+    weights : np.ndarray
+        Weight of every item
+
+    capacity : int
+        Capacity of the knapsack
+
+    Returns
+    -------
+    Tuple[int, np.ndarray]
+        Best value and either or not every item is taken
+    """
+    best = np.zeros(capacity + 1, dtype=np.int64)
+    decisions = []
+    for value, weight in zip(values.tolist(), weights.tolist()):
+        if weight > capacity:
+            decisions.append(None)
+            continue
+        candidate = best[:capacity + 1 - weight] + value
+        take = candidate > best[weight:]
+        best[weight:][take] = candidate[take]
+        # Bit c - weight of the row tells if the item is taken with capacity c
+        decisions.append(np.packbits(take))
+
+    # Walk the decisions back from the full capacity
+    taken = np.zeros(len(values), dtype=bool)
+    left_capacity = capacity
+    for i in range(len(values) - 1, -1, -1):
+        row = decisions[i]
+        weight = int(weights[i])
+        if row is None or left_capacity < weight:
+            continue
+        bit = left_capacity - weight
+        if row[bit >> 3] >> (7 - (bit & 7)) & 1:
+            taken[i] = True
+            left_capacity -= weight
+
+    return int(best[capacity]), taken
+
+def dp_split(values: np.ndarray, weights: np.ndarray, capacity: int, memory_limit: int = dp_memory_limit) -> np.ndarray:
+    """Items taken by an optimal solution, in memory bounded by `memory_limit`
+
+    Small tables are solved by `dp_table`. Larger ones are split in two halves of
+    items (Hirschberg): the profiles of both halves give the best share of the
+    capacity, then every half is solved with its share.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Value of every item
+
+    weights : np.ndarray
+        Weight of every item
+
+    capacity : int
+        Capacity of the knapsack
+
+    memory_limit : int, optional
+        Largest decision table in bytes, by default 256 MiB
+
+    Returns
+    -------
+    np.ndarray
+        Either or not every item is taken
+    """
+    item_count = len(values)
+    if item_count <= 1 or item_count * (capacity + 1) // 8 <= memory_limit:
+        return dp_table(values, weights, capacity)[1]
+
+    half = item_count // 2
+    head = dp_profile(values[:half], weights[:half], capacity)
+    tail = dp_profile(values[half:], weights[half:], capacity)
+    head_capacity = int(np.argmax(head + tail[::-1]))
+
+    return np.concatenate((
+        dp_split(values[:half], weights[:half], head_capacity, memory_limit),
+        dp_split(values[half:], weights[half:], capacity - head_capacity, memory_limit),
+    ))
+
+def solve_dp(instance: KnapsackInstance, memory_limit: int = dp_memory_limit) -> Tuple[int, List[int]]:
+    """Optimal value and item-take choices of a knapsack instance by dynamic programming"""
+    values = np.asarray(instance.values, dtype=np.int64)
+    weights = np.asarray(instance.weights, dtype=np.int64)
+    taken = dp_split(values, weights, instance.capacity, memory_limit)
+    return int(values[taken].sum()), taken.astype(int).tolist()
+
+# Dynamic programming when the table has at most dp_cell_limit cells, branch and bound otherwise
+def use_dp(instance, cell_limit=dp_cell_limit):
+    return instance.item_count * (instance.capacity + 1) <= cell_limit
+
+# backend is "dp", "bnb" or "auto" to pick one by the size of the table
+# The other arguments go to the branch and bound solver, which preprocesses the instance and stops at its limits
+# Dynamic programming can neither stop early nor report its progress, so "auto" leaves it out when node_limit,
+# time_limit or progress is given, and "dp" ignores them
+def solve_it(input_data, backend="auto", preprocess=True, strategy="depth_first", node_limit=None, time_limit=None, progress=None):
+    # parse the input
+    instance = KnapsackInstance.from_instance(input_data)
+
+    limited = node_limit is not None or time_limit is not None or progress is not None
+    if backend == "bnb" or (backend == "auto" and (limited or not use_dp(instance))):
+        return branch_and_bound.solve_it(input_data, preprocess, strategy, node_limit, time_limit, progress)
+
+    value, taken = solve_dp(instance)
+    # The table covers every solution, so its best value is optimal
+    optimal = 1
+
+    # prepare the solution in the specified output format
+    output_data = str(value) + ' ' + str(optimal) + '\n'
+    output_data += ' '.join(map(str, taken))
+    return output_data
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        file_location = sys.argv[1].strip()
+        input_data = read_instance(file_location)
+        print(solve_it(input_data))
+    else:
+        print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/ks_4_0)')
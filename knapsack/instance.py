@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from common.cache import cached_arrays
+from common.loader import Text, parse_knapsack
+
+
+class KnapsackInstance:
+
+    capacity: int
+    values: np.ndarray
+    weights: np.ndarray
+    order: np.ndarray
+
+    def __init__(self, capacity: int, values: np.ndarray, weights: np.ndarray, order: Optional[np.ndarray] = None):
+        """Items of a knapsack instance with their value density order
+
+        Parameters
+        ----------
+        capacity : int
+            Capacity of the knapsack
+
+        values : np.ndarray
+            Value of every item
+
+        weights : np.ndarray
+            Weight of every item
+
+        order : Optional[np.ndarray], optional
+            Item indexes sorted by decreasing value/weight ratio, computed if not given
+        """
+        self.capacity = capacity
+        self.values = values
+        self.weights = weights
+        self.order = ratio_order(values, weights) if order is None else order
+
+    def __repr__(self) -> str:
+        return f"KnapsackInstance(items={self.item_count}, capacity={self.capacity})"
+
+    @classmethod
+    def from_instance(cls, input_data: Text, cache_dir: Optional[str] = None) -> 'KnapsackInstance':
+        """Builds the instance of a ks_* file through the on-disk cache
+
+        The first call parses the instance and stores the item arrays and their ratio
+        order under the hash of its contents. Later calls memory-map them instead.
+
+        Parameters
+        ----------
+        input_data : Text
+            Contents of the instance file
+
+        cache_dir : Optional[str], optional
+            Directory of the cache, by default `common.cache.CACHE_DIR`
+
+        Returns
+        -------
+        KnapsackInstance
+            Instance with read-only arrays when they come from the cache
+        """
+        arrays = cached_arrays(input_data, "knapsack", build_knapsack_arrays, cache_dir)
+        return cls(int(arrays["capacity"][0]), arrays["values"], arrays["weights"], arrays["order"])
+
+    @property
+    def item_count(self) -> int:
+        return len(self.values)
+
+
+def ratio_order(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Item indexes sorted by decreasing value/weight ratio, ties kept in input order"""
+    return np.argsort(-(values / weights), kind="stable")
+
+def build_knapsack_arrays(input_data: Text) -> Dict[str, np.ndarray]:
+    """Parses a ks_* instance into the arrays stored in the cache"""
+    capacity, values, weights = parse_knapsack(input_data)
+    return {
+        "capacity": np.array([capacity]),
+        "values": values,
+        "weights": weights,
+        "order": ratio_order(values, weights),
+    }
@@ -1,44 +1,108 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import os
+import sys
+from time import perf_counter
+
+import numpy as np
 from ortools.algorithms.python import knapsack_solver
 
-def solve_it(input_data):
-    # parse the input
-    lines = input_data.split('\n')
-
-    firstLine = lines[0].split()
-    item_count = int(firstLine[0])
-    capacity = int(firstLine[1])
-    capacities = []
-    capacities.append(capacity)
-
-    values = []
-    weights = [[]]
-
-    for i in range(1, item_count+1):
-        line = lines[i]
-        parts = line.split()
-        values.append(int(parts[0]))
-        weights[0].append(int(parts[1]))
-
-    # Create the solver.
-    solver = knapsack_solver.KnapsackSolver(
-        knapsack_solver.SolverType.KNAPSACK_MULTIDIMENSION_BRANCH_AND_BOUND_SOLVER,
-        "KnapsackExample",
-    )
-
-    solver.init(values, weights, capacities)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+from common.loader import read_instance
+from knapsack.instance import KnapsackInstance
+from knapsack.preprocessing import KnapsackReduction, fractional_bound
+
+# Cells of the dynamic programming table up to which the divide and conquer solver is used
+# Lower than dp_cell_limit of dynamic_programming/solver.py: this solver ignores the time limit,
+# so it only gets the tables it solves in seconds, and branch and bound takes the others
+or_dp_cell_limit = 2 * 10**8
+# Largest number of items of the solver specialized in small instances
+small_item_limit = 64
+
+SolverType = knapsack_solver.SolverType
+
+# Solvers of the process by type, reused by every problem solved after the first one
+solver_sessions = {}
+
+# OR-tools solver for a problem of item_count items
+# Dynamic programming by divide and conquer when its table is small enough, in memory linear in the capacity
+# then the solver of at most 64 items, then branch and bound
+# Only branch and bound stops at its time limit, so it replaces the solver of 64 items when there is one
+def select_solver_type(item_count, capacity, time_limit=None):
+
+    if item_count * (capacity + 1) <= or_dp_cell_limit:
+        return SolverType.KNAPSACK_DIVIDE_AND_CONQUER_SOLVER
+    if item_count <= small_item_limit and time_limit is None:
+        return SolverType.KNAPSACK_64ITEMS_SOLVER
+    return SolverType.KNAPSACK_MULTIDIMENSION_BRANCH_AND_BOUND_SOLVER
+
+# Solver of a type, created on first use and then reused
+def get_solver(solver_type):
+
+    if solver_type not in solver_sessions:
+        solver_sessions[solver_type] = knapsack_solver.KnapsackSolver(solver_type, solver_type.name)
+    return solver_sessions[solver_type]
+
+# Solves a problem with OR-tools, returns its value, item-take choices and upper bound
+# The items come in ratio order, the solver stops after time_limit seconds
+# solver_type is by default the one of select_solver_type
+def solve_knapsack(values, weights, capacity, time_limit=None, solver_type=None):
+
+    if solver_type is None:
+        solver_type = select_solver_type(len(values), capacity, time_limit)
+    solver = get_solver(solver_type)
+
+    # The arrays go to the solver as they are, and a reused solver keeps the last time limit
+    solver.init(values, [weights], [capacity])
+    solver.set_time_limit(float("inf") if time_limit is None else time_limit)
     value = solver.solve()
 
-    taken = [0]*item_count
+    taken = [int(solver.best_solution_contains(index)) for index in range(len(values))]
+
+    # A solver stopped by its time limit only proves the fractional bound
+    if solver.is_solution_optimal():
+        return value, taken, value
+    return value, taken, fractional_bound(values, weights, capacity)
+
+# preprocess reduces the instance to a core problem around the break item before solving
+# The solver stops after time_limit seconds and keeps the best solution found, opt is 1 only when it is proven
+# optimal. progress receives the statistics of the search after every problem solved
+# solver_type forces an OR-tools solver instead of the one of select_solver_type
+def solve_it(input_data, preprocess=True, time_limit=None, progress=None, solver_type=None):
+    # parse the input
+    instance = KnapsackInstance.from_instance(input_data)
+    reduction = KnapsackReduction(instance) if preprocess else None
+    start = perf_counter()
+
+    # Every core problem gets the time left
+    def solve(values, weights, capacity):
+        time_left = None if time_limit is None else max(time_limit - (perf_counter() - start), 0.0)
+        value, taken, bound = solve_knapsack(values, weights, capacity, time_left, solver_type)
+        if progress is not None:
+            # The values of a core problem leave out the items the reduction fixed
+            fixed_value = 0 if reduction is None else reduction.fixed_value
+            progress({
+                "time": perf_counter() - start,
+                "nodes": None,
+                "nodes_per_second": None,
+                "value": value + fixed_value,
+                "bound": bound + fixed_value,
+            })
+        return value, taken, bound
+
+    if preprocess:
+        value, taken, bound = reduction.solve(solve)
+    else:
+        value, taken, bound = solve(instance.values[instance.order], instance.weights[instance.order], instance.capacity)
+        taken = [taken[i] for i in np.argsort(instance.order).tolist()]
 
-    for index in range(item_count):
-        if solver.best_solution_contains(index):
-            taken[index] = 1
+    # The values are integers, so is the optimum
+    optimal = int(np.floor(bound + 1e-9) <= value)
     
     # prepare the solution in the specified output format
-    output_data = str(value) + ' ' + str(0) + '\n'
+    output_data = str(value) + ' ' + str(optimal) + '\n'
     output_data += ' '.join(map(str, taken))
     return output_data
 
@@ -47,8 +111,7 @@ if __name__ == '__main__':
     import sys
     if len(sys.argv) > 1:
         file_location = sys.argv[1].strip()
-        with open(file_location, 'r') as input_data_file:
-            input_data = input_data_file.read()
+        input_data = read_instance(file_location)
         print(solve_it(input_data))
     else:
         print('This test requires an input file.  Please select one from the data directory. (i.e. python solver.py ./data/ks_4_0)')
@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from knapsack.instance import KnapsackInstance
+
+# Initial number of items of the core around the break item, doubled until the core solution is proven optimal
+core_size = 50
+
+# Solver of a core problem: values and weights in ratio order and capacity, gives the value and item-take choices
+# of its best solution and an upper bound on the optimum, equal to the value when the solution is optimal
+CoreSolver = Callable[[np.ndarray, np.ndarray, int], Tuple[float, List[int], float]]
+
+
+def fractional_bound(values: np.ndarray, weights: np.ndarray, capacity: int) -> float:
+    """Fractional (Dantzig) bound of items in ratio order: the prefix that fits and a fraction of the next item"""
+    prefix_weights = np.cumsum(weights)
+    break_pos = int(np.searchsorted(prefix_weights, capacity, side="right"))
+    bound = float(np.sum(values[:break_pos]))
+    if break_pos < len(values):
+        left_capacity = capacity - (int(prefix_weights[break_pos - 1]) if break_pos else 0)
+        bound += float(values[break_pos] * left_capacity / weights[break_pos])
+    return bound
+
+
+class KnapsackReduction:
+
+    instance: KnapsackInstance
+    positions: np.ndarray
+    break_pos: int
+    upper_bound: float
+    lower_bound: int
+    fixed_value: int
+    free: np.ndarray
+
+    def __init__(self, instance: KnapsackInstance):
+        """Reduction of a knapsack instance to the items whose value is still undecided
+
+        Items heavier than the capacity are dropped. The others are kept in ratio
+        order, where the break item is the first one that no longer fits. With r the
+        ratio of the break item and U the fractional (Dantzig) bound, any solution
+        whose choice of item j differs from the fractional one is worth at most
+        U - |v_j - r w_j| (Dembo and Hammer, 1980). Items for which this is below the
+        greedy solution plus one are fixed to their fractional choice, and the others
+        are free.
+
+        Parameters
+        ----------
+        instance : KnapsackInstance
+            Instance to reduce
+        """
+        self.instance = instance
+        capacity = instance.capacity
+        order = np.asarray(instance.order)
+
+        # Items that fit alone in the knapsack, in ratio order
+        self.positions = order[np.asarray(instance.weights)[order] <= capacity]
+        self.values = np.asarray(instance.values, dtype=np.int64)[self.positions]
+        self.weights = np.asarray(instance.weights, dtype=np.int64)[self.positions]
+
+        prefix_weights = np.cumsum(self.weights)
+        self.break_pos = int(np.searchsorted(prefix_weights, capacity, side="right"))
+        # Fractional choice of every item, the break item being left out
+        self.lp_taken = np.arange(len(self.positions)) < self.break_pos
+
+        # Greedy solution: every item that still fits, in ratio order
+        self.taken = np.zeros(instance.item_count, dtype=bool)
+        left_capacity = capacity
+        for pos, weight in enumerate(self.weights.tolist()):
+            if weight <= left_capacity:
+                left_capacity -= weight
+                self.taken[self.positions[pos]] = True
+        self.lower_bound = int(self.values[self.taken[self.positions]].sum())
+
+        if self.break_pos == len(self.positions):
+            # Every item fits, the greedy solution takes them all
+            self.upper_bound = float(self.lower_bound)
+            self.gap = np.zeros(len(self.positions))
+        else:
+            ratio = self.values[self.break_pos] / self.weights[self.break_pos]
+            left_capacity = capacity - (prefix_weights[self.break_pos - 1] if self.break_pos else 0)
+            self.upper_bound = float(self.values[:self.break_pos].sum() + ratio * left_capacity)
+            self.gap = np.abs(self.values - ratio * self.weights)
+        self.free = self.undecided(self.lower_bound)
+        # Value of the items fixed out of the core being solved
+        self.fixed_value = 0
+
+    def __repr__(self) -> str:
+        return f"KnapsackReduction(items={self.instance.item_count}, free={self.free_count})"
+
+    @property
+    def free_count(self) -> int:
+        return int(np.count_nonzero(self.free))
+
+    def undecided(self, lower_bound: int) -> np.ndarray:
+        """Items, in ratio order, whose other choice may still lead to a value above `lower_bound`"""
+        return self.upper_bound - self.gap >= lower_bound + 1 - 1e-9
+
+    def core(self, size: int) -> np.ndarray:
+        """Free items, in ratio order, among the `size` items closest to the break item"""
+        pos = np.arange(len(self.positions))
+        return self.free & (np.abs(pos - self.break_pos) <= size // 2)
+
+    def solve(self, solve: CoreSolver, size: int = core_size) -> Tuple[int, List[int], int]:
+        """Solves the instance by solving its core with `solve`, expanding the core as needed
+
+        The items out of the core keep their fractional choice. The core solution,
+        completed with them, is optimal once every item out of the core is fixed by
+        the bound test against its value. Otherwise the core doubles and is solved
+        again (Pisinger, 1997).
+
+        When `solve` stops before proving its core solution optimal, the core is not
+        expanded and the bound also covers the solutions out of the core.
+
+        While `solve` runs, `fixed_value` is the value of the items fixed out of its
+        core, to be added to its values to get those of the whole instance.
+
+        Parameters
+        ----------
+        solve : CoreSolver
+            Exact solver of a core problem
+
+        size : int, optional
+            Initial number of items around the break item, by default 50
+
+        Returns
+        -------
+        Tuple[int, List[int], int]
+            Value and item-take choices in the order of the instance, and upper bound on the optimum
+        """
+        upper_bound = self.lower_bound
+        while self.free.any():
+            core = self.core(size)
+            fixed = self.lp_taken & ~core
+            core_capacity = self.instance.capacity - int(self.weights[fixed].sum())
+            fixed_value = self.fixed_value = int(self.values[fixed].sum())
+
+            core_value, core_taken, core_bound = 0, [], 0
+            if core.any():
+                core_value, core_taken, core_bound = solve(self.values[core], self.weights[core], core_capacity)
+            value = int(round(core_value)) + fixed_value
+            if value > self.lower_bound:
+                self.lower_bound = value
+                self.taken[:] = False
+                self.taken[self.positions[fixed]] = True
+                self.taken[self.positions[core][np.asarray(core_taken, dtype=bool)]] = True
+
+            # Items out of the core that could still beat the solution
+            self.free = self.undecided(self.lower_bound)
+            outside = self.free & ~core
+            if core_bound > core_value:
+                # A better solution keeps the choices out of the core or changes one of the free ones
+                upper_bound = max(
+                    [self.lower_bound, core_bound + fixed_value] + (self.upper_bound - self.gap[outside]).tolist()
+                )
+                upper_bound = int(np.floor(upper_bound + 1e-9))
+                break
+            if not outside.any():
+                upper_bound = self.lower_bound
+                break
+            size *= 2
+
+        return self.lower_bound, self.taken.astype(int).tolist(), upper_bound
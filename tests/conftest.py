@@ -0,0 +1,15 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# The solvers are scripts importing each other from the root of the repository
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.abspath(root))
+
+# The instance cache of the tests is kept out of the home directory, it is read when common.cache is imported
+cache_dir = tempfile.mkdtemp(prefix="optimization-cache-")
+os.environ["OPTIMIZATION_CACHE_DIR"] = cache_dir
+
+def pytest_unconfigure(config):
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from common import cache
+
+def build(input_data):
+    build.calls += 1
+    return {"numbers": np.arange(3), "count": np.array([3])}
+
+def test_cache_dir_outside_home():
+    assert cache.CACHE_DIR == os.environ["OPTIMIZATION_CACHE_DIR"]
+
+def test_entry_missing_an_array_is_a_miss(tmp_path):
+    build.calls = 0
+    cache_dir = str(tmp_path)
+    cache.cached_arrays("1 2 3", "test", build, cache_dir)
+    arrays = cache.cached_arrays("1 2 3", "test", build, cache_dir)
+    assert build.calls == 1
+    assert sorted(arrays) == ["count", "numbers"]
+
+    os.remove(os.path.join(cache_dir, cache.instance_key("1 2 3", "test"), "count.npy"))
+    arrays = cache.cached_arrays("1 2 3", "test", build, cache_dir)
+    assert build.calls == 2
+    assert np.array_equal(arrays["numbers"], np.arange(3)) and arrays["count"][0] == 3
+
+    # The broken entry was replaced
+    cache.cached_arrays("1 2 3", "test", build, cache_dir)
+    assert build.calls == 2
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from coloring.graph import Graph
+from common.loader import read_instance
+
+data = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "coloring", "data")
+
+def read_graph(name):
+    return Graph.from_instance(read_instance(os.path.join(data, name)))
+
+def is_feasible(graph, colors):
+    edges = graph.edges()
+    return all(colors[i] != colors[j] for i, j in edges.tolist())
+
+@pytest.mark.parametrize("name", ["gc_100_5", "gc_250_9"])
+def test_matrix_backend_short_time_limit(name):
+    pytest.importorskip("highspy")
+    from coloring.pyomo.solver import initialize_color, solve_matrix
+
+    graph = read_graph(name)
+    colors, lower_bound = solve_matrix(graph, initialize_color(graph), time_limit=0.001)
+    assert is_feasible(graph, colors)
+    assert 0 <= lower_bound <= len(set(colors))
+
+@pytest.mark.parametrize("node_count, edges", [
+    (1, []),
+    (3, []),
+    (3, [(0, 1), (1, 2), (0, 2)]),
+    (4, [(0, 1), (1, 2), (1, 3)]),
+])
+def test_find_clique_all_nodes_tabu(node_count, edges):
+    from coloring.clique import find_clique
+
+    # Every node of these graphs ends up tabu once the clique is emptied
+    graph = Graph.from_edges(node_count, edges)
+    clique = find_clique(graph, seed=0)
+    adjacency = graph.adjacency_bitsets()
+    assert clique and all(adjacency[i] >> j & 1 for i in clique for j in clique if i != j)
+
+@pytest.mark.parametrize("solver", ["dsatur", "tabu", "pyomo", "portfolio"])
+def test_solve_it_gc_4_1(solver):
+    pytest.importorskip("highspy")
+    module = pytest.importorskip(f"coloring.{solver}.solver")
+
+    graph = read_graph("gc_4_1")
+    output_data = module.solve_it(read_instance(os.path.join(data, "gc_4_1")))
+    header, values = output_data.split("\n")
+    colors = [int(c) for c in values.split()]
+    assert header == "2 1"
+    assert is_feasible(graph, colors)
+
+@pytest.mark.parametrize("backend", ["pyomo", "matrix"])
+def test_time_limit_covers_the_build(backend):
+    pytest.importorskip("highspy")
+    from coloring.pyomo.solver import initialize_color, solve_matrix, solve_pyomo
+
+    graph = read_graph("gc_100_5")
+    solve = solve_matrix if backend == "matrix" else solve_pyomo
+    timing = {}
+    colors, lower_bound = solve(graph, initialize_color(graph), timing=timing, time_limit=1e-9)
+    assert timing["solve"] == 0.0
+    assert is_feasible(graph, colors)
+    assert lower_bound == 0
+
+def test_parallel_search():
+    from coloring.tabu.solver import TabuColoring
+
+    graph = read_graph("gc_50_3")
+    shared = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    tabu_coloring = TabuColoring(graph, seed=0, retry_limit=4, step_limit=2000, time_limit=30)
+    colors, color_count = tabu_coloring.parallel_search(list(range(graph.node_count)), graph.node_count, workers=2)
+
+    assert len(set(colors)) <= color_count < graph.node_count
+    assert color_count >= len(tabu_coloring.clique)
+    assert is_feasible(graph, colors)
+    # The best coloring reaches the checkpoint and the shared graph is released
+    assert tabu_coloring.checkpoint.values == list(colors)
+    if os.path.isdir("/dev/shm"):
+        assert set(os.listdir("/dev/shm")) <= shared
@@ -0,0 +1,60 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from coloring import convert
+from common.loader import parse_coloring, read_instance
+
+data = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "coloring", "data")
+gc_4_1 = os.path.join(data, "gc_4_1")
+
+@pytest.mark.parametrize("base", [0, 1])
+def test_col_round_trip(tmp_path, base):
+    col_path, = convert.convert_all(gc_4_1, str(tmp_path / "col"), "col", base=base)
+    with open(col_path) as f:
+        first_edge = f.read().splitlines()[1]
+    assert first_edge == f"e {base} {base + 1}"
+
+    gc_path, = convert.convert_all(col_path, str(tmp_path / "gc"), "gc", base=base)
+    expected = parse_coloring(read_instance(gc_4_1))
+    node_count, edges = parse_coloring(read_instance(gc_path))
+    assert node_count == expected[0]
+    assert np.array_equal(edges, expected[1])
+
+def test_col_round_trip_module_base(tmp_path, monkeypatch):
+    monkeypatch.setattr(convert, "dimacs_base", 1)
+    col_path, = convert.convert_all(gc_4_1, str(tmp_path / "col"), "col")
+    gc_path, = convert.convert_all(col_path, str(tmp_path / "gc"), "gc")
+    assert read_instance(gc_path).split() == read_instance(gc_4_1).split()
+
+def test_edge_array_out_of_range():
+    numbers = np.array([3, 2, 0, 1, 1, 3], dtype="<i4")
+    with pytest.raises(ValueError, match="Wrong number of nodes"):
+        convert.parse_edge_array(numbers.tobytes())
+
+def test_convert_all_bounds_files_in_flight(tmp_path, monkeypatch):
+    workers = 2
+    read, converted = [], []
+    instances = convert.iter_instances
+
+    # Files read and not converted yet: those in flight and the one being read
+    def iter_instances(location):
+        for name, input_data in instances(location):
+            read.append(name)
+            assert len(read) - len(converted) <= workers + 1
+            yield name, input_data
+
+    def convert_file(name, *args):
+        time.sleep(0.01)
+        converted.append(name)
+        return name
+
+    # Threads share the recording lists, the scheduling is the same as with processes
+    monkeypatch.setattr(convert, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(convert, "iter_instances", iter_instances)
+    monkeypatch.setattr(convert, "convert_file", convert_file)
+    paths = convert.convert_all(data, str(tmp_path), "col", workers=workers)
+    assert paths == read and len(paths) > workers + 1
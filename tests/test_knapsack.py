@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from common.loader import read_instance
+
+data = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "knapsack", "data")
+
+@pytest.mark.parametrize("solver", ["branch_and_bound", "or_branch_and_bound"])
+@pytest.mark.parametrize("name", ["ks_50_1", "ks_100_2"])
+def test_progress_reports_whole_instance(solver, name):
+    # OR-tools may fail to load its shared library next to highspy
+    module = pytest.importorskip(f"knapsack.{solver}.solver", exc_type=ImportError)
+
+    reports = []
+    output_data = module.solve_it(read_instance(os.path.join(data, name)), progress=reports.append)
+    value, optimal = map(int, output_data.split("\n")[0].split())
+    assert optimal == 1
+    # The last core problem solved is the one of the final solution
+    assert reports[-1]["value"] == value
+    assert reports[-1]["bound"] == value
+
+def test_dp_falls_back_to_preprocessed_branch_and_bound(monkeypatch):
+    from knapsack.branch_and_bound import solver as branch_and_bound
+    from knapsack.dynamic_programming import solver as dynamic_programming
+
+    input_data = read_instance(os.path.join(data, "ks_1000_0"))
+    # No table is small enough for dynamic programming
+    monkeypatch.setattr(dynamic_programming.use_dp, "__defaults__", (0,))
+    assert dynamic_programming.solve_it(input_data) == branch_and_bound.solve_it(input_data)
+
+    # The node limit reaches the branch and bound of the core problem
+    output_data = dynamic_programming.solve_it(input_data, node_limit=1)
+    assert output_data == branch_and_bound.solve_it(input_data, node_limit=1)
+
+def test_dp_leaves_limited_runs_to_branch_and_bound():
+    from knapsack.branch_and_bound import solver as branch_and_bound
+    from knapsack.dynamic_programming import solver as dynamic_programming
+
+    input_data = read_instance(os.path.join(data, "ks_50_1"))
+    reports = []
+    output_data = dynamic_programming.solve_it(input_data, time_limit=10, progress=reports.append)
+    assert output_data == branch_and_bound.solve_it(input_data, time_limit=10)
+    assert reports
+
+@pytest.mark.parametrize("preprocess", [True, False])
+def test_branch_and_bound_prints_integer_value(preprocess):
+    from knapsack.branch_and_bound import solver as branch_and_bound
+
+    output_data = branch_and_bound.solve_it(read_instance(os.path.join(data, "ks_19_0")), preprocess)
+    assert output_data.split()[0] == "12248"